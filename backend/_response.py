@@ -0,0 +1,84 @@
+# _response.py
+import base64
+import hashlib
+import json
+from decimal import Decimal
+from typing import Any, Dict, Optional, Set
+
+from boto3.dynamodb.types import Binary
+
+from _utils import CORS_HEADERS
+
+try:  # optional: noticeably faster on large list pages when it is deployed
+    import orjson
+except ImportError:
+    orjson = None
+
+
+def _default(value: Any) -> Any:
+    # types the boto3 resource API hands back that JSON has no encoding for
+    if isinstance(value, Decimal):
+        return int(value) if value == value.to_integral_value() else float(value)
+    if isinstance(value, (set, frozenset)):
+        return list(value)
+    if isinstance(value, Binary):
+        value = value.value
+    if isinstance(value, (bytes, bytearray)):
+        return base64.b64encode(bytes(value)).decode("ascii")
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def dumps(value: Any) -> str:
+    if orjson is not None:
+        return orjson.dumps(value, default=_default).decode("utf-8")
+    return json.dumps(value, default=_default, separators=(",", ":"))
+
+
+def json_response(
+    status_code: int, body: Any, headers: Optional[Dict[str, Any]] = None
+) -> Dict[str, Any]:
+    return {
+        "statusCode": status_code,
+        "body": dumps(body),
+        "headers": dict(CORS_HEADERS, **headers) if headers else CORS_HEADERS,
+    }
+
+
+def etag(*parts: Any) -> str:
+    """Strong ETag over the JSON encoding of `parts`."""
+    digest = hashlib.sha256(
+        json.dumps(parts, sort_keys=True, default=_default).encode("utf-8")
+    ).hexdigest()
+    return f'"{digest[:32]}"'
+
+
+def if_none_match(event: Dict[str, Any]) -> Set[str]:
+    """
+    ETags listed in the request's If-None-Match header (weak ones included).
+    Handlers read consistently when this is non-empty, so a tag is never
+    matched against an item older than the client's copy.
+    """
+    headers = event.get("headers") or {}
+    value = next(
+        (v for k, v in headers.items() if k.lower() == "if-none-match" and v), ""
+    )
+    tags = set()
+    for tag in value.split(","):
+        tag = tag.strip()
+        if tag.startswith("W/"):
+            tag = tag[2:]
+        if tag:
+            tags.add(tag)
+    return tags
+
+
+def etag_matches(tags: Set[str], tag: str) -> bool:
+    return tag in tags or "*" in tags
+
+
+def not_modified(tag: str) -> Dict[str, Any]:
+    return {
+        "statusCode": 304,
+        "body": "",
+        "headers": dict(CORS_HEADERS, ETag=tag),
+    }
@@ -0,0 +1,342 @@
+# _search.py
+import os
+import re
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Iterable, List, Optional, Set, Tuple
+
+from boto3.dynamodb.conditions import Attr, Key
+from botocore.exceptions import ClientError
+
+from _utils import (
+    SEARCH_INDEX_TABLE,
+    batch_get_items,
+    batch_write,
+    get_dynamodb,
+    search_index_table,
+)
+
+# Inverted trigram index over the searchKey of incidents and users.
+# One posting item per (tenant, kind, trigram, document id):
+#   term = "<tenant>#<kind>#<trigram>", id = "<document id>"
+# A query word matches the documents present in the posting lists of all its
+# trigrams; several words intersect. Candidates are then fetched and checked
+# against the real searchKey, so the index never produces false positives.
+
+GRAM_SIZE = 3
+# candidates fetched and verified per query; past this the result is flagged
+# as truncated
+SEARCH_MAX_CANDIDATES = int(os.environ.get("SEARCH_MAX_CANDIDATES", 5000))
+# posting-list queries / item batch-gets in flight
+SEARCH_CONCURRENCY = int(os.environ.get("SEARCH_CONCURRENCY", 8))
+# candidates x remaining trigrams up to which long posting lists are probed
+# key by key instead of being read to the end
+SEARCH_PROBE_MAX_KEYS = int(os.environ.get("SEARCH_PROBE_MAX_KEYS", 1000))
+
+# Verified, ranked matches of recent queries, so later pages of a search are
+# served from this container without redoing the index and item reads.
+# The first page always recomputes.
+SEARCH_CACHE_SIZE = int(os.environ.get("SEARCH_CACHE_SIZE", 8))
+SEARCH_CACHE_SECONDS = float(os.environ.get("SEARCH_CACHE_SECONDS", 60))
+_matches_cache: "OrderedDict[Tuple[str, ...], Tuple[float, List[Dict], bool]]" = OrderedDict()
+
+
+def _words(text: str) -> List[str]:
+    return [w for w in re.split(r"\s+", (text or "").lower()) if w]
+
+
+def _grams(word: str) -> Set[str]:
+    if len(word) < GRAM_SIZE:
+        return set()
+    return {word[i : i + GRAM_SIZE] for i in range(len(word) - GRAM_SIZE + 1)}
+
+
+def search_terms(text: str) -> Set[str]:
+    terms: Set[str] = set()
+    for word in _words(text):
+        terms |= _grams(word)
+    return terms
+
+
+def _term(tenant: str, kind: str, gram: str) -> str:
+    return f"{tenant}#{kind}#{gram}"
+
+
+def index_document(
+    tenant: str,
+    kind: str,
+    doc_id: str,
+    old_text: Optional[str],
+    new_text: Optional[str],
+) -> None:
+    """
+    Brings the postings of one document from `old_text` to `new_text`.
+    Pass old_text=None on create and new_text=None on delete.
+    """
+    old_terms = search_terms(old_text or "")
+    new_terms = search_terms(new_text or "")
+    removed = old_terms - new_terms
+    added = new_terms - old_terms
+    if not removed and not added:
+        return
+    with search_index_table.batch_writer() as batch:
+        for gram in removed:
+            batch.delete_item(Key={"term": _term(tenant, kind, gram), "id": doc_id})
+        for gram in added:
+            batch.put_item(
+                Item={
+                    "term": _term(tenant, kind, gram),
+                    "id": doc_id,
+                    "tenant": tenant,
+                    "kind": kind,
+                }
+            )
+
+
+def index_documents(
+    kind: str,
+    changes: Iterable[Tuple[str, str, Optional[str], Optional[str]]],
+) -> Dict[Tuple[str, str], str]:
+    """
+    Bulk form of index_document for (tenant, doc_id, old_text, new_text)
+    tuples. Postings go through the parallel batch_write; returns
+    {(tenant, doc_id): error} for the documents whose postings were not all
+    written (incidents/backfill_index repairs them).
+    """
+    requests = []
+    # (term, id) of each posting -> (tenant, doc_id) it belongs to
+    owners: Dict[Tuple[str, str], Tuple[str, str]] = {}
+    for tenant, doc_id, old_text, new_text in changes:
+        old_terms = search_terms(old_text or "")
+        new_terms = search_terms(new_text or "")
+        for gram in old_terms - new_terms:
+            requests.append(
+                {"DeleteRequest": {"Key": {"term": _term(tenant, kind, gram), "id": doc_id}}}
+            )
+        for gram in new_terms - old_terms:
+            requests.append(
+                {
+                    "PutRequest": {
+                        "Item": {
+                            "term": _term(tenant, kind, gram),
+                            "id": doc_id,
+                            "tenant": tenant,
+                            "kind": kind,
+                        }
+                    }
+                }
+            )
+        for gram in old_terms ^ new_terms:
+            owners[(_term(tenant, kind, gram), doc_id)] = (tenant, doc_id)
+
+    failed: Dict[Tuple[str, str], str] = {}
+    for request, error in batch_write(SEARCH_INDEX_TABLE, requests):
+        # unprocessed requests come back as new objects: match them by key
+        if "PutRequest" in request:
+            key = request["PutRequest"]["Item"]
+        else:
+            key = request["DeleteRequest"]["Key"]
+        failed.setdefault(owners[(key["term"], key["id"])], error)
+    return failed
+
+
+def sync_search_key(
+    table,
+    kind: str,
+    item: Dict[str, Any],
+    search_key: str,
+) -> Dict[str, Any]:
+    """
+    Called with the ALL_NEW image of an update that didn't touch searchKey
+    (it can't be assembled inside an update expression): the stored
+    searchKey is still the previous one. When `search_key` (built
+    from the new image) differs, writes it and moves the index postings.
+    The write is conditioned on the item's version, which every update
+    increments, so a newer concurrent update (even within the same second),
+    which refreshes searchKey itself, is never overwritten with stale text.
+    """
+    previous = item.get("searchKey")
+    if previous == search_key:
+        return item
+    try:
+        table.update_item(
+            Key={"tenant": item["tenant"], "id": item["id"]},
+            UpdateExpression="SET searchKey = :searchKey",
+            ConditionExpression=Attr("version").eq(item.get("version")),
+            ExpressionAttributeValues={":searchKey": search_key},
+        )
+    except ClientError as e:
+        if e.response["Error"]["Code"] != "ConditionalCheckFailedException":
+            raise
+        return item
+    index_document(item["tenant"], kind, item["id"], previous, search_key)
+    return dict(item, searchKey=search_key)
+
+
+def is_indexable(query: str) -> bool:
+    """Queries made only of words shorter than a trigram can't use the index."""
+    return any(len(w) >= GRAM_SIZE for w in _words(query))
+
+
+def _posting_page(
+    client, tenant: str, kind: str, gram: str, last_key: Optional[Dict[str, Any]]
+) -> Tuple[Set[str], Optional[Dict[str, Any]]]:
+    kwargs = {
+        "TableName": SEARCH_INDEX_TABLE,
+        "KeyConditionExpression": Key("term").eq(_term(tenant, kind, gram)),
+        "ProjectionExpression": "id",
+    }
+    if last_key:
+        kwargs["ExclusiveStartKey"] = last_key
+    resp = client.query(**kwargs)
+    return {item["id"] for item in resp.get("Items", [])}, resp.get("LastEvaluatedKey")
+
+
+def _posting_rest(
+    client, tenant: str, kind: str, gram: str, ids: Set[str], last_key: Dict[str, Any]
+) -> Set[str]:
+    ids = set(ids)
+    while last_key:
+        page, last_key = _posting_page(client, tenant, kind, gram, last_key)
+        ids |= page
+    return ids
+
+
+def _probe(tenant: str, kind: str, grams: List[str], ids: Set[str]) -> Set[str]:
+    """The ids of `ids` that have a posting under every one of `grams`."""
+    keys = [{"term": _term(tenant, kind, g), "id": i} for g in grams for i in ids]
+    hits: Dict[str, int] = {}
+    for posting in batch_get_items(SEARCH_INDEX_TABLE, keys, fields=["id"]):
+        hits[posting["id"]] = hits.get(posting["id"], 0) + 1
+    return {i for i, count in hits.items() if count == len(grams)}
+
+
+def candidate_ids(tenant: str, kind: str, query: str) -> Set[str]:
+    """
+    Ids present in the posting list of every trigram of `query`. The first
+    page of each list is read in parallel; lists that fit in it are
+    intersected smallest first. Longer lists are then either probed for the
+    remaining candidates or, when too many are left, read to the end in
+    parallel.
+    """
+    grams = sorted(search_terms(query))
+    if not grams:
+        return set()
+    client = get_dynamodb().meta.client  # thread-safe, (de)serializes like a Table
+    with ThreadPoolExecutor(max_workers=min(SEARCH_CONCURRENCY, len(grams))) as pool:
+        firsts = list(
+            pool.map(lambda g: _posting_page(client, tenant, kind, g, None), grams)
+        )
+        complete = sorted((ids for ids, last in firsts if not last), key=len)
+        partial = [(g, ids, last) for g, (ids, last) in zip(grams, firsts) if last]
+
+        result: Optional[Set[str]] = None
+        for ids in complete:
+            result = ids if result is None else result & ids
+            if not result:
+                return set()
+        if not partial:
+            return result or set()
+        if result is not None and len(result) * len(partial) <= SEARCH_PROBE_MAX_KEYS:
+            return _probe(tenant, kind, [g for g, _, _ in partial], result)
+
+        rest = pool.map(lambda p: _posting_rest(client, tenant, kind, *p), partial)
+        for ids in sorted(rest, key=len):
+            result = ids if result is None else result & ids
+            if not result:
+                return set()
+    return result or set()
+
+
+def _score(item: Dict[str, Any], query: str) -> Tuple[int, int, str]:
+    text = item.get("searchKey") or ""
+    tokens = set(_words(text))
+    words = _words(query)
+    phrase = 1 if " ".join(words) in text else 0
+    whole_words = sum(1 for w in words if w in tokens)
+    return phrase, whole_words, item.get("updatedAt") or ""
+
+
+def _verified_matches(
+    table_name: str, tenant: str, kind: str, query: str
+) -> Tuple[List[Dict[str, Any]], bool]:
+    """
+    Every candidate whose searchKey contains all words of `query`, ranked,
+    and whether candidates past SEARCH_MAX_CANDIDATES were left out.
+    """
+    ids = sorted(candidate_ids(tenant, kind, query))
+    truncated = len(ids) > SEARCH_MAX_CANDIDATES
+    ids = ids[:SEARCH_MAX_CANDIDATES]
+    chunks = [ids[i : i + 100] for i in range(0, len(ids), 100)]
+    with ThreadPoolExecutor(max_workers=max(1, min(SEARCH_CONCURRENCY, len(chunks)))) as pool:
+        pages = pool.map(
+            lambda chunk: batch_get_items(
+                table_name, [{"tenant": tenant, "id": i} for i in chunk]
+            ),
+            chunks,
+        )
+        items = [item for page in pages for item in page]
+
+    words = _words(query)
+    matches = [
+        item for item in items if all(w in (item.get("searchKey") or "") for w in words)
+    ]
+    matches.sort(key=lambda item: _score(item, query), reverse=True)
+    return matches, truncated
+
+
+def search(
+    table_name: str,
+    tenant: str,
+    kind: str,
+    query: str,
+    offset: int,
+    page_size: int,
+    predicate: Optional[Callable[[Dict[str, Any]], bool]] = None,
+) -> Tuple[List[Dict[str, Any]], Optional[int], bool]:
+    """
+    Runs `query` against the index and returns one ranked page of items, the
+    offset of the next page (None on the last page) and whether the query
+    had more candidates than SEARCH_MAX_CANDIDATES. Every word must appear
+    in the item's searchKey; `predicate` applies the remaining list filters.
+    Ranking: whole phrase, then whole-word matches, then most recently
+    updated. Pages after the first reuse this container's verified matches
+    for up to SEARCH_CACHE_SECONDS.
+    """
+    key = (table_name, tenant, kind, query)
+    now = time.monotonic()
+    cached = _matches_cache.get(key) if offset else None
+    if cached is not None and cached[0] > now:
+        _, matches, truncated = cached
+        _matches_cache.move_to_end(key)
+    else:
+        matches, truncated = _verified_matches(table_name, tenant, kind, query)
+        _matches_cache[key] = (now + SEARCH_CACHE_SECONDS, matches, truncated)
+        _matches_cache.move_to_end(key)
+        while len(_matches_cache) > SEARCH_CACHE_SIZE:
+            _matches_cache.popitem(last=False)
+
+    if predicate is not None:
+        matches = [item for item in matches if predicate(item)]
+    page = matches[offset : offset + page_size]
+    next_offset = offset + page_size if offset + page_size < len(matches) else None
+    return page, next_offset, truncated
+
+
+def reindex(kind: str, items: Iterable[Dict[str, Any]]) -> int:
+    """Writes the postings of already stored items (idempotent)."""
+    count = 0
+    with search_index_table.batch_writer(overwrite_by_pkeys=["term", "id"]) as batch:
+        for item in items:
+            for gram in search_terms(item.get("searchKey") or ""):
+                batch.put_item(
+                    Item={
+                        "term": _term(item["tenant"], kind, gram),
+                        "id": item["id"],
+                        "tenant": item["tenant"],
+                        "kind": kind,
+                    }
+                )
+            count += 1
+    return count
@@ -0,0 +1,229 @@
+# _summary.py
+import os
+import time
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+from boto3.dynamodb.conditions import Attr
+from botocore.exceptions import ClientError
+
+from _utils import summary_table, now_iso
+
+# One summary item per tenant, kept current from the IncidentsTable stream:
+#   total, byState / byLocation / byCreator (value -> count),
+#   latest (the SUMMARY_LATEST_LIMIT most recently updated incidents),
+#   version (optimistic lock) and recentEventIds (stream retry dedupe).
+# Every change is a read-modify-write conditioned on `version`, so concurrent
+# shards never lose an update, and a batch retried by Lambda skips the
+# records whose eventID it already applied.
+# byLocation and byCreator are keyed by free text, so only their
+# SUMMARY_MAX_KEYS largest counts are kept; this keeps the item well under
+# DynamoDB's 400 KB limit. A value that drops out and comes back starts
+# counting again from zero, and the summary is flagged `truncated`.
+#
+# A rebuild counts what a consistent read returns while stream records of
+# earlier writes may still be in flight. It stores `counted` (incident id ->
+# version it counted) until `countedUntil`; meanwhile apply_changes skips
+# records at or below an incident's counted version, and MODIFY / REMOVE
+# records of incidents the rebuild never saw (deleted before it read them).
+# Only the SUMMARY_MAX_COUNTED most recently updated incidents are stored;
+# `countedSince` marks the cut, and records of incidents last updated before
+# it are applied as usual (they were counted at their old image).
+
+SUMMARY_LATEST_LIMIT = int(os.environ.get("SUMMARY_LATEST_LIMIT", 10))
+SUMMARY_MAX_ATTEMPTS = 5
+RECENT_EVENT_IDS = 200
+SUMMARY_MAX_KEYS = int(os.environ.get("SUMMARY_MAX_KEYS", 100))
+COUNTERS = (("byState", "state"), ("byLocation", "location"), ("byCreator", "creator"))
+CAPPED_COUNTERS = ("byLocation", "byCreator")
+LATEST_FIELDS = ("id", "title", "state", "location", "creator", "createdAt", "updatedAt")
+# how long after a rebuild late stream records are checked against `counted`
+SUMMARY_REBUILD_FENCE_SECONDS = int(os.environ.get("SUMMARY_REBUILD_FENCE_SECONDS", 3600))
+SUMMARY_MAX_COUNTED = int(os.environ.get("SUMMARY_MAX_COUNTED", 5000))
+
+
+def empty_summary(tenant: str) -> Dict[str, Any]:
+    summary: Dict[str, Any] = {"tenant": tenant, "total": 0, "latest": []}
+    for name, _ in COUNTERS:
+        summary[name] = {}
+    return summary
+
+
+def _count(summary: Dict[str, Any], incident: Optional[Dict[str, Any]], step: int) -> None:
+    if not incident:
+        return
+    summary["total"] = int(summary.get("total", 0)) + step
+    for name, attribute in COUNTERS:
+        value = incident.get(attribute)
+        if value is None or value == "":
+            continue
+        counts = summary.setdefault(name, {})
+        counts[value] = int(counts.get(value, 0)) + step
+        if counts[value] <= 0:
+            del counts[value]
+
+
+def _latest_entry(incident: Dict[str, Any]) -> Dict[str, Any]:
+    return {k: incident[k] for k in LATEST_FIELDS if k in incident}
+
+
+def _track_latest(
+    summary: Dict[str, Any],
+    incident_id: str,
+    new: Optional[Dict[str, Any]],
+) -> None:
+    latest = [e for e in summary.get("latest") or [] if e.get("id") != incident_id]
+    if new:
+        latest.append(_latest_entry(new))
+    latest.sort(key=lambda e: e.get("updatedAt") or "", reverse=True)
+    summary["latest"] = latest[:SUMMARY_LATEST_LIMIT]
+
+
+def apply_change(
+    summary: Dict[str, Any],
+    old: Optional[Dict[str, Any]],
+    new: Optional[Dict[str, Any]],
+) -> None:
+    """Moves the counters of one incident from its old image to its new one."""
+    _count(summary, old, -1)
+    _count(summary, new, 1)
+    incident_id = (new or old or {}).get("id")
+    if incident_id:
+        _track_latest(summary, incident_id, new)
+
+
+def _record_version(
+    old: Optional[Dict[str, Any]], new: Optional[Dict[str, Any]]
+) -> int:
+    # every write increments `version`; a delete comes after the old image
+    if new:
+        return int(new.get("version", 0))
+    return int((old or {}).get("version", 0)) + 1
+
+
+def _already_counted(
+    summary: Dict[str, Any],
+    old: Optional[Dict[str, Any]],
+    new: Optional[Dict[str, Any]],
+) -> bool:
+    """
+    True when a rebuild's consistent read already reflected this change.
+    Records the change's version otherwise, while the fence is up.
+    """
+    counted = summary.get("counted")
+    if counted is None:
+        return False
+    if int(summary.get("countedUntil", 0)) < time.time():
+        # late records of pre-rebuild writes have all been delivered by now
+        for name in ("counted", "countedUntil", "countedSince"):
+            summary.pop(name, None)
+        return False
+    incident_id = (new or old or {}).get("id")
+    version = _record_version(old, new)
+    if incident_id in counted:
+        if version <= int(counted[incident_id]):
+            return True
+    elif old and (old.get("updatedAt") or "") >= summary.get("countedSince", ""):
+        # not read by the rebuild and no INSERT seen since: deleted before it
+        return True
+    counted[incident_id] = version
+    return False
+
+
+def _cap(summary: Dict[str, Any]) -> None:
+    for name in CAPPED_COUNTERS:
+        counts = summary.get(name) or {}
+        if len(counts) > SUMMARY_MAX_KEYS:
+            top = sorted(counts.items(), key=lambda kv: (-int(kv[1]), kv[0]))
+            summary[name] = dict(top[:SUMMARY_MAX_KEYS])
+            summary["truncated"] = True
+
+
+def _put(summary: Dict[str, Any], current: Optional[Dict[str, Any]]) -> bool:
+    """Writes `summary` if the stored one is still `current`; False on a race."""
+    # read before bumping: apply_changes updates `current` in place
+    version = int((current or {}).get("version", 0))
+    condition = Attr("version").eq(version) if current else Attr("tenant").not_exists()
+    _cap(summary)
+    summary["version"] = version + 1
+    summary["updatedAt"] = now_iso()
+    try:
+        summary_table.put_item(Item=summary, ConditionExpression=condition)
+        return True
+    except ClientError as e:
+        if e.response["Error"]["Code"] != "ConditionalCheckFailedException":
+            raise
+        return False
+
+
+def apply_changes(
+    tenant: str,
+    changes: List[Tuple[str, Optional[Dict[str, Any]], Optional[Dict[str, Any]]]],
+) -> int:
+    """
+    Applies stream changes (event_id, old_image, new_image), in stream order,
+    to the tenant's summary. Returns how many were applied; changes seen in
+    `recentEventIds` or already counted by a rebuild are skipped.
+    """
+    for _ in range(SUMMARY_MAX_ATTEMPTS):
+        current = summary_table.get_item(Key={"tenant": tenant}).get("Item")
+        summary = current or empty_summary(tenant)
+        seen = list(summary.get("recentEventIds") or [])
+        applied = 0
+        for event_id, old, new in changes:
+            if event_id in seen:
+                continue
+            seen.append(event_id)
+            if _already_counted(summary, old, new):
+                continue
+            apply_change(summary, old, new)
+            applied += 1
+        if not applied:
+            return 0
+
+        summary["recentEventIds"] = seen[-RECENT_EVENT_IDS:]
+        if _put(summary, current):
+            return applied
+        # another shard updated the summary first: re-read and redo
+    raise RuntimeError(f"summary of tenant {tenant} kept changing, giving up")
+
+
+def rebuild(
+    tenant: str, load_incidents: Callable[[], Iterable[Dict[str, Any]]]
+) -> Dict[str, Any]:
+    """
+    Recomputes a tenant's summary from `load_incidents()` (a strongly
+    consistent read of its incidents) and overwrites it, conditioned on the
+    version read before loading. When the stream changes the summary in the
+    meantime, the incidents are read again.
+    """
+    for _ in range(SUMMARY_MAX_ATTEMPTS):
+        current = summary_table.get_item(
+            Key={"tenant": tenant}, ConsistentRead=True
+        ).get("Item")
+        summary = empty_summary(tenant)
+        counted = []
+        for incident in load_incidents():
+            apply_change(summary, None, incident)
+            counted.append(
+                (incident.get("updatedAt") or "", incident["id"], incident.get("version", 0))
+            )
+        if len(counted) > SUMMARY_MAX_COUNTED:
+            counted.sort(reverse=True)
+            counted = counted[:SUMMARY_MAX_COUNTED]
+            summary["countedSince"] = counted[-1][0]
+        summary["counted"] = {id_: int(version) for _, id_, version in counted}
+        summary["countedUntil"] = int(time.time()) + SUMMARY_REBUILD_FENCE_SECONDS
+        summary["recentEventIds"] = list((current or {}).get("recentEventIds") or [])
+        if _put(summary, current):
+            return summary
+    raise RuntimeError(f"summary of tenant {tenant} kept changing, giving up")
+
+
+def public_summary(summary: Dict[str, Any]) -> Dict[str, Any]:
+    result = {"tenant": summary["tenant"], "total": summary.get("total", 0)}
+    for name, _ in COUNTERS:
+        result[name] = summary.get(name) or {}
+    result["latest"] = summary.get("latest") or []
+    result["truncated"] = bool(summary.get("truncated"))
+    result["updatedAt"] = summary.get("updatedAt")
+    return result
@@ -0,0 +1,172 @@
+# _tokens.py
+import base64
+import hashlib
+import hmac
+import json
+import os
+import time
+import uuid
+from typing import Any, Dict, Optional, Set, Tuple
+
+from boto3.dynamodb.conditions import Key
+
+from _utils import tokens_table
+
+# Signed access tokens: "<tenant>#s1.<claims>.<signature>", HMAC-SHA256 over
+# the base64url claims. They are verified locally without reading
+# TokensTable. Opaque "<tenant>#<hex>" tokens keep working alongside them.
+#
+# Revocation stores the token's jti under the REVOKED_PARTITION of
+# TokensTable (expiring with the token). Each container keeps the deny-list
+# in memory and reloads it every REVOCATION_REFRESH_SECONDS; until the first
+# load succeeds, signed tokens are answered with 503.
+
+TOKEN_MODE = os.environ.get("TOKEN_MODE", "opaque")  # "opaque" | "signed"
+TOKEN_SIGNING_KEY = os.environ.get("TOKEN_SIGNING_KEY", "")
+REVOCATION_REFRESH_SECONDS = float(os.environ.get("REVOCATION_REFRESH_SECONDS", 30))
+# until the first load succeeds, retry this often instead
+REVOCATION_RETRY_SECONDS = float(os.environ.get("REVOCATION_RETRY_SECONDS", 1))
+REVOKED_PARTITION = "#revoked"
+SIGNED_PREFIX = "s1."
+
+_deny_list: Optional[Set[str]] = None  # None until loaded once
+_deny_list_loaded_at = 0.0
+
+
+class RevocationUnavailable(Exception):
+    """The deny-list has never loaded, so revocation can't be checked."""
+
+
+def _b64encode(raw: bytes) -> str:
+    return base64.urlsafe_b64encode(raw).rstrip(b"=").decode()
+
+
+def _b64decode(data: str) -> bytes:
+    return base64.urlsafe_b64decode(data + "=" * (-len(data) % 4))
+
+
+def _sign(payload: str) -> str:
+    key = TOKEN_SIGNING_KEY.encode("utf-8")
+    return _b64encode(hmac.new(key, payload.encode("ascii"), hashlib.sha256).digest())
+
+
+def signed_tokens_enabled() -> bool:
+    return TOKEN_MODE == "signed" and bool(TOKEN_SIGNING_KEY)
+
+
+def is_signed_token(token: str) -> bool:
+    _, _, value = token.partition("#")
+    return value.startswith(SIGNED_PREFIX)
+
+
+def issue_signed_token(
+    tenant: str, user: Dict[str, Any], expires_epoch: int
+) -> Tuple[str, str]:
+    """Returns (token, jti)."""
+    jti = uuid.uuid4().hex
+    claims = {
+        "t": tenant,
+        "u": user["id"],
+        "r": list(user.get("roles") or []),
+        "exp": int(expires_epoch),
+        "jti": jti,
+    }
+    payload = _b64encode(json.dumps(claims, separators=(",", ":")).encode("utf-8"))
+    return f"{tenant}#{SIGNED_PREFIX}{payload}.{_sign(payload)}", jti
+
+
+def _claims(token: str) -> Optional[Dict[str, Any]]:
+    """Checks signature, tenant prefix and expiry; ignores revocation."""
+    if not TOKEN_SIGNING_KEY:
+        return None
+    tenant, _, value = token.partition("#")
+    if not value.isascii():
+        # base64url and the signature are ASCII; anything else would make
+        # _sign/compare_digest raise instead of rejecting the token
+        return None
+    try:
+        payload, signature = value[len(SIGNED_PREFIX) :].split(".")
+    except ValueError:
+        return None
+    if not hmac.compare_digest(signature, _sign(payload)):
+        return None
+    try:
+        claims = json.loads(_b64decode(payload))
+    except ValueError:
+        return None
+    if claims.get("t") != tenant or claims.get("exp", 0) <= time.time():
+        return None
+    return claims
+
+
+def _refresh_deny_list() -> None:
+    global _deny_list, _deny_list_loaded_at
+    now = time.time()
+    if now - _deny_list_loaded_at < REVOCATION_REFRESH_SECONDS:
+        return
+    revoked: Set[str] = set()
+    kwargs = {
+        "KeyConditionExpression": Key("tenant").eq(REVOKED_PARTITION),
+        "ProjectionExpression": "id",
+    }
+    try:
+        while True:
+            resp = tokens_table.query(**kwargs)
+            revoked.update(item["id"] for item in resp.get("Items", []))
+            last_key = resp.get("LastEvaluatedKey")
+            if not last_key:
+                break
+            kwargs["ExclusiveStartKey"] = last_key
+    except Exception as e:
+        print("deny-list refresh failed", e)
+        if _deny_list is None:
+            # nothing to serve yet: retry soon, verify_signed_token rejects
+            _deny_list_loaded_at = (
+                now - REVOCATION_REFRESH_SECONDS + REVOCATION_RETRY_SECONDS
+            )
+        else:
+            # keep serving the previous list, retry on the next refresh
+            _deny_list_loaded_at = now
+        return
+    _deny_list = revoked
+    _deny_list_loaded_at = now
+
+
+def verify_signed_token(token: str) -> Optional[Dict[str, Any]]:
+    """
+    Returns token data shaped like a TokensTable item (tenant, userId, user
+    with roles, expiresAt), or None when the token is invalid or revoked.
+    Raises RevocationUnavailable while no deny-list has been loaded.
+    """
+    claims = _claims(token)
+    if not claims:
+        return None
+    _refresh_deny_list()
+    if _deny_list is None:
+        raise RevocationUnavailable()
+    if claims["jti"] in _deny_list:
+        return None
+    return {
+        "id": token,
+        "tenant": claims["t"],
+        "userId": claims["u"],
+        "user": {"id": claims["u"], "tenant": claims["t"], "roles": claims["r"]},
+        "expiresAt": claims["exp"],
+        "jti": claims["jti"],
+    }
+
+
+def revoke_signed_token(token: str) -> bool:
+    claims = _claims(token)
+    if not claims:
+        return False
+    tokens_table.put_item(
+        Item={
+            "tenant": REVOKED_PARTITION,
+            "id": claims["jti"],
+            "expiresAt": claims["exp"],  # TTL drops it once the token expires anyway
+        }
+    )
+    if _deny_list is not None:
+        _deny_list.add(claims["jti"])
+    return True
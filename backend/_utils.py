@@ -1,27 +1,90 @@
 # _utils.py
 import os
 import hashlib
+import random
 import binascii
 import uuid
 import time
 import boto3
-from typing import Tuple
+from botocore.config import Config
+from concurrent.futures import ThreadPoolExecutor
+from boto3.dynamodb.conditions import Key
+from functools import lru_cache
+from typing import Any, Callable, Dict, List, Optional, Tuple
 
 USERS_TABLE = os.environ.get("USERS_TABLE", "UsersTable")
 TOKENS_TABLE = os.environ.get("TOKENS_TABLE", "TokensTable")
 INCIDENTS_TABLE = os.environ.get("INCIDENTS_TABLE", "IncidentsTable")
+SEARCH_INDEX_TABLE = os.environ.get("SEARCH_INDEX_TABLE", "SearchIndexTable")
+SUMMARY_TABLE = os.environ.get("SUMMARY_TABLE", "SummaryTable")
+VERSIONS_TABLE = os.environ.get("VERSIONS_TABLE", "VersionsTable")
+INCIDENTS_STATE_INDEX = os.environ.get(
+    "INCIDENTS_STATE_INDEX", "tenantState-updatedAt-index"
+)
+INCIDENTS_UPDATED_INDEX = os.environ.get(
+    "INCIDENTS_UPDATED_INDEX", "tenant-updatedAt-index"
+)
+# a list ETag is only issued once the tenant's version stamp is this old, so
+# the (eventually consistent) index page it tags includes the write that
+# moved the stamp
+LIST_ETAG_SETTLE_SECONDS = float(os.environ.get("LIST_ETAG_SETTLE_SECONDS", 5))
 
 CORS_HEADERS = {
     "Access-Control-Allow-Origin": "*",
     "Access-Control-Allow-Credentials": True,
+    "Access-Control-Expose-Headers": "ETag",
 }
 VALID_INCIDENT_STATES = {"PENDING", "ATTENDING", "FINISHED"}
 VALID_USER_STATUSES = {"ACTIVE", "SUSPENDED"}
 
-dynamodb = boto3.resource("dynamodb")
-users_table = dynamodb.Table(USERS_TABLE)
-tokens_table = dynamodb.Table(TOKENS_TABLE)
-incidents_table = dynamodb.Table(INCIDENTS_TABLE)
+# budgets for list endpoints that keep reading until a page is full
+LIST_MAX_READ_UNITS = float(os.environ.get("LIST_MAX_READ_UNITS", 100))
+LIST_TIME_BUDGET_MS = int(os.environ.get("LIST_TIME_BUDGET_MS", 3000))
+
+# bulk writes: requests in flight and attempts per 25-item request
+BATCH_WRITE_CONCURRENCY = int(os.environ.get("BATCH_WRITE_CONCURRENCY", 8))
+BATCH_WRITE_MAX_ATTEMPTS = int(os.environ.get("BATCH_WRITE_MAX_ATTEMPTS", 6))
+
+# Shared client settings: a pool large enough for batch/parallel work,
+# adaptive retries for throttling, keep-alive and short timeouts so a stuck
+# connection fails well inside the API Gateway 29s limit.
+BOTO_CONFIG = Config(
+    max_pool_connections=int(os.environ.get("BOTO_MAX_POOL_CONNECTIONS", 50)),
+    retries={"mode": "adaptive", "max_attempts": 5},
+    tcp_keepalive=True,
+    connect_timeout=float(os.environ.get("BOTO_CONNECT_TIMEOUT", 2)),
+    read_timeout=float(os.environ.get("BOTO_READ_TIMEOUT", 5)),
+)
+
+
+@lru_cache(maxsize=None)
+def get_dynamodb():
+    # built on first use: handlers that return before touching DynamoDB
+    # (validation errors, rejected tokens) skip the ~100ms resource setup
+    # DYNAMODB_ENDPOINT_URL points tools such as export.py at DynamoDB Local
+    endpoint_url = os.environ.get("DYNAMODB_ENDPOINT_URL") or None
+    return boto3.resource("dynamodb", config=BOTO_CONFIG, endpoint_url=endpoint_url)
+
+
+class _LazyTable:
+    """Stands in for a boto3 Table and creates it on first attribute access."""
+
+    def __init__(self, name: str):
+        self._name = name
+        self._table = None
+
+    def __getattr__(self, attr):
+        if self._table is None:
+            self._table = get_dynamodb().Table(self._name)
+        return getattr(self._table, attr)
+
+
+users_table = _LazyTable(USERS_TABLE)
+tokens_table = _LazyTable(TOKENS_TABLE)
+incidents_table = _LazyTable(INCIDENTS_TABLE)
+search_index_table = _LazyTable(SEARCH_INDEX_TABLE)
+summary_table = _LazyTable(SUMMARY_TABLE)
+versions_table = _LazyTable(VERSIONS_TABLE)
 
 
 # Password hashing using PBKDF2-HMAC-SHA256
@@ -48,40 +111,449 @@ def epoch_seconds_in(duration_seconds: int) -> int:
     return int(time.time()) + int(duration_seconds)
 
 
-def get_user(tenant, id):
-    resp = users_table.get_item(Key={"tenant": tenant, "id": id})
+def get_user(tenant, id, fields=None, consistent=False):
+    resp = users_table.get_item(
+        Key={"tenant": tenant, "id": id},
+        ConsistentRead=consistent,
+        **projection_args(fields),
+    )
     item = resp.get("Item")
     if not item:
         return None
     return item
 
 
-def get_incident(tenant, id):
-    resp = incidents_table.get_item(Key={"tenant": tenant, "id": id})
+def bump_version_stamp(kind: str, tenant: str) -> bool:
+    """
+    Moves the tenant's stamp after a write; list ETags are derived from it
+    (see get_version_stamp). Called once the write is applied, so a failure
+    is logged and returned as False rather than failing the request.
+    """
+    try:
+        versions_table.update_item(
+            Key={"scope": f"{kind}#{tenant}"},
+            UpdateExpression="ADD #v :one SET bumpedAt = :now",
+            ExpressionAttributeNames={"#v": "version"},
+            ExpressionAttributeValues={":one": 1, ":now": int(time.time() * 1000)},
+        )
+        return True
+    except Exception as e:
+        print("version stamp bump failed", kind, tenant, e)
+        return False
+
+
+def get_version_stamp(kind: str, tenant: str) -> Optional[int]:
+    """
+    The tenant's stamp for `kind`, or None while it is younger than
+    LIST_ETAG_SETTLE_SECONDS. Any write to the tenant's items moves the
+    stamp, so list handlers tag a page with (stamp, request) and an unchanged
+    stamp means the same request would return the same page. A settling
+    stamp gets no ETag: list pages come from indexes that may not show the
+    latest write yet, and must not be tagged with its stamp.
+    """
+    resp = versions_table.get_item(
+        Key={"scope": f"{kind}#{tenant}"}, ConsistentRead=True
+    )
+    item = resp.get("Item") or {}
+    bumped_at = int(item.get("bumpedAt", 0)) / 1000.0
+    if time.time() - bumped_at < LIST_ETAG_SETTLE_SECONDS:
+        return None
+    return int(item.get("version", 0))
+
+
+def get_incident(tenant, id, fields=None, consistent=False):
+    resp = incidents_table.get_item(
+        Key={"tenant": tenant, "id": id},
+        ConsistentRead=consistent,
+        **projection_args(fields),
+    )
     item = resp.get("Item")
     if not item:
         return None
     return item
 
 
-def split_token(token):
-    return token.split("#")
+# Attributes clients may ask for through `fields`. Anything else (searchKey,
+# tenantState, passwordHash, salt) never leaves the API. "summary" is what the
+# list views render; "full" is the whole allowlist.
+RESPONSE_FIELDS = {
+    "incident": {
+        "full": (
+            "tenant", "id", "title", "creator", "location", "state",
+            "media", "description", "createdAt", "updatedAt", "version",
+        ),
+        "summary": (
+            "tenant", "id", "title", "creator", "location", "state",
+            "createdAt", "updatedAt",
+        ),
+    },
+    "user": {
+        "full": (
+            "tenant", "id", "email", "fullName", "roles", "phone",
+            "notes", "status", "createdAt", "updatedAt", "version",
+        ),
+        "summary": (
+            "tenant", "id", "email", "fullName", "roles", "status", "updatedAt",
+        ),
+    },
+}
+
+
+def resolve_fields(
+    kind: str, requested: Any, default: str
+) -> Tuple[Optional[List[str]], Optional[str]]:
+    """
+    Validates a `fields` parameter: "summary", "full" or a list of allowed
+    attribute names (tenant and id are always included). Returns
+    (fields, None) or (None, error message).
+    """
+    sets = RESPONSE_FIELDS[kind]
+    if requested is None:
+        requested = default
+    if isinstance(requested, str):
+        if requested not in sets:
+            return None, f"fields must be a list of attributes or one of {sorted(sets)}"
+        return list(sets[requested]), None
+    if not isinstance(requested, list) or not all(isinstance(f, str) for f in requested):
+        return None, "fields must be a list of attribute names"
+    unknown = sorted(set(requested) - set(sets["full"]))
+    if unknown:
+        return None, f"unknown fields {unknown}, allowed: {list(sets['full'])}"
+    return list(dict.fromkeys(["tenant", "id"] + requested)), None
+
+
+def select_fields(item: Dict[str, Any], fields: List[str]) -> Dict[str, Any]:
+    return {k: item[k] for k in fields if k in item}
+
+
+def projection_args(fields: Optional[List[str]]) -> Dict[str, Any]:
+    """ProjectionExpression arguments for `fields`; every name goes through a
+    placeholder, so reserved words such as state and status are safe."""
+    if not fields:
+        return {}
+    names = {f"#p{i}": field for i, field in enumerate(fields)}
+    return {
+        "ProjectionExpression": ", ".join(names),
+        "ExpressionAttributeNames": names,
+    }
+
+
+def batch_get_items(
+    table_name: str,
+    keys: List[Dict[str, Any]],
+    fields: Optional[List[str]] = None,
+) -> List[Dict[str, Any]]:
+    """
+    Fetches `keys` with BatchGetItem in chunks of 100, retrying unprocessed
+    keys with a short backoff. Duplicate keys are requested once (BatchGetItem
+    rejects them). `fields` limits the attributes returned; include the key
+    attributes to match items back to keys. Result order is not guaranteed.
+    """
+    unique = list({tuple(sorted(k.items())): k for k in keys}.values())
+    projection = projection_args(fields)
+    items: List[Dict[str, Any]] = []
+    for start in range(0, len(unique), 100):
+        request = {table_name: dict(projection, Keys=unique[start : start + 100])}
+        attempt = 0
+        while request:
+            resp = get_dynamodb().batch_get_item(RequestItems=request)
+            items.extend(resp.get("Responses", {}).get(table_name, []))
+            request = resp.get("UnprocessedKeys") or None
+            if request:
+                attempt += 1
+                time.sleep(min(0.05 * 2**attempt, 1.0))
+    return items
+
+
+def _write_chunk(
+    table_name: str, requests: List[Dict[str, Any]]
+) -> List[Dict[str, Any]]:
+    """One BatchWriteItem of up to 25 write requests; returns those never processed."""
+    client = get_dynamodb().meta.client  # thread-safe, (de)serializes like a Table
+    request = {table_name: requests}
+    for attempt in range(BATCH_WRITE_MAX_ATTEMPTS):
+        resp = client.batch_write_item(RequestItems=request)
+        request = resp.get("UnprocessedItems") or None
+        if not request:
+            return []
+        # full jitter keeps throttled chunks from retrying in lockstep
+        time.sleep(random.uniform(0, min(0.05 * 2**attempt, 2.0)))
+    return request[table_name]
+
+
+def batch_write(
+    table_name: str, requests: List[Dict[str, Any]]
+) -> List[Tuple[Dict[str, Any], str]]:
+    """
+    Sends BatchWriteItem requests ({"PutRequest": ...} / {"DeleteRequest": ...}),
+    25 per call and BATCH_WRITE_CONCURRENCY calls in flight, retrying
+    unprocessed ones with backoff. Returns (request, error) for each request
+    that could not be applied; chunks run in parallel, so requests within one
+    call must touch distinct keys.
+    """
+    chunks = [requests[i : i + 25] for i in range(0, len(requests), 25)]
+
+    def write(chunk):
+        try:
+            return [(r, "throttled") for r in _write_chunk(table_name, chunk)]
+        except Exception as e:
+            return [(r, str(e)) for r in chunk]
+
+    with ThreadPoolExecutor(max_workers=BATCH_WRITE_CONCURRENCY) as pool:
+        return [failure for failures in pool.map(write, chunks) for failure in failures]
+
+
+def batch_put_items(
+    table_name: str, items: List[Dict[str, Any]]
+) -> List[Tuple[Dict[str, Any], Optional[str]]]:
+    """
+    Writes `items` through batch_write. Returns (item, error) for each item
+    that could not be written.
+    """
+    failures = batch_write(table_name, [{"PutRequest": {"Item": item}} for item in items])
+    return [(request["PutRequest"]["Item"], error) for request, error in failures]
+
+
+# backfills stop reading pages once less than this is left of the invocation
+BACKFILL_RESERVE_MS = int(os.environ.get("BACKFILL_RESERVE_MS", 60_000))
+
+
+def run_backfill(
+    table,
+    event: Optional[Dict[str, Any]],
+    context,
+    process: Callable[[List[Dict[str, Any]]], None],
+) -> Optional[Dict[str, Any]]:
+    """
+    Feeds `table` page by page to `process`: one tenant's partition when the
+    event has "tenant", the whole table otherwise, starting after the event's
+    "exclusiveStartKey". Returns the key to pass back as exclusiveStartKey
+    when the invocation ran low on time, or None once the end was reached.
+    """
+    event = event or {}
+    kwargs: Dict[str, Any] = {}
+    read = table.scan
+    if event.get("tenant"):
+        read = table.query
+        kwargs["KeyConditionExpression"] = Key("tenant").eq(event["tenant"])
+    last_key = event.get("exclusiveStartKey")
+    remaining = getattr(context, "get_remaining_time_in_millis", None)
+    while True:
+        if last_key:
+            kwargs["ExclusiveStartKey"] = last_key
+        resp = read(**kwargs)
+        process(resp.get("Items", []))
+        last_key = resp.get("LastEvaluatedKey")
+        if not last_key:
+            return None
+        if remaining is not None and remaining() < BACKFILL_RESERVE_MS:
+            return last_key
+
+
+def build_tenant_state(tenant: str, state: str) -> str:
+    # partition key of the state index: one partition per tenant and state
+    return f"{tenant}#{state}"
+
+
+def fill_page(
+    read: Callable[..., Dict[str, Any]],
+    read_kwargs: Dict[str, Any],
+    page_size: int,
+    key_names: Tuple[str, ...],
+    max_read_units: float = LIST_MAX_READ_UNITS,
+    time_budget_ms: int = LIST_TIME_BUDGET_MS,
+) -> Tuple[List[Dict[str, Any]], Optional[Dict[str, Any]], float]:
+    """
+    Calls `read` (a table's query or scan) until `page_size` items have passed
+    the FilterExpression, the partition is exhausted, or the read unit or time
+    budget is spent. DynamoDB applies `Limit` before filtering, so a single
+    call can come back nearly empty.
+
+    Returns (items, last_key, consumed_read_units). `last_key` resumes right
+    after the last returned item, so nothing is skipped when a read matched
+    more items than the page had room for. `key_names` are the table key
+    attributes plus the index key attributes when querying an index.
+    """
+    kwargs = dict(read_kwargs)
+    kwargs["Limit"] = page_size
+    kwargs["ReturnConsumedCapacity"] = "TOTAL"
+    deadline = time.monotonic() + time_budget_ms / 1000.0
+
+    items: List[Dict[str, Any]] = []
+    consumed = 0.0
+    while True:
+        resp = read(**kwargs)
+        consumed += float((resp.get("ConsumedCapacity") or {}).get("CapacityUnits", 0))
+        batch = resp.get("Items", [])
+        last_key = resp.get("LastEvaluatedKey")
+
+        room = page_size - len(items)
+        if len(batch) >= room:
+            items.extend(batch[:room])
+            if len(batch) > room:
+                last_key = {k: items[-1][k] for k in key_names if k in items[-1]}
+            return items, last_key, consumed
+
+        items.extend(batch)
+        if not last_key:
+            return items, None, consumed
+        if consumed >= max_read_units or time.monotonic() >= deadline:
+            return items, last_key, consumed
+        kwargs["ExclusiveStartKey"] = last_key
+
+
+def parse_list_page(
+    body: Dict[str, Any],
+) -> Tuple[Optional[Dict[str, Any]], Optional[str]]:
+    """
+    Paging parameters shared by the list endpoints: pageSize/limit (default
+    50, at most 100), lastEvaluatedKey/lastKey and fill. Returns
+    ({"limit", "lastKey", "fill"}, None) or (None, error message).
+    """
+    default_limit = 50
+    max_limit = 100
+    limit_raw = body.get("pageSize") or body.get("limit")
+    try:
+        limit = int(limit_raw) if limit_raw is not None else default_limit
+    except (TypeError, ValueError):
+        return None, "pageSize/limit must be a number"
+    if limit <= 0:
+        limit = default_limit
+
+    last_key = body.get("lastEvaluatedKey") or body.get("lastKey")
+    if last_key is not None and not isinstance(last_key, dict):
+        return None, "lastEvaluatedKey must be an object"
+
+    return {
+        "limit": min(limit, max_limit),
+        "lastKey": last_key,
+        # keep reading until the page is full unless the client opts out
+        "fill": body.get("fill", True) is not False,
+    }, None
+
+
+def list_page(
+    read: Callable[..., Dict[str, Any]],
+    read_kwargs: Dict[str, Any],
+    filters: List[Any],
+    page: Dict[str, Any],
+    key_names: Tuple[str, ...],
+    fields: List[str],
+) -> Dict[str, Any]:
+    """
+    Response body of a list endpoint: one fill_page of `read` with `filters`
+    AND-ed into the FilterExpression, projected to `fields`.
+    """
+    kwargs = dict(read_kwargs)
+    if filters:
+        filter_expr = filters[0]
+        for extra in filters[1:]:
+            filter_expr = filter_expr & extra
+        kwargs["FilterExpression"] = filter_expr
+    if page["lastKey"]:
+        kwargs["ExclusiveStartKey"] = page["lastKey"]
+    # the index keys are read too: fill_page builds the cursor from them
+    kwargs.update(projection_args(list(dict.fromkeys(fields + list(key_names)))))
+
+    # a zero read budget stops after the first read
+    items, next_key, consumed = fill_page(
+        read,
+        kwargs,
+        page["limit"],
+        key_names,
+        max_read_units=LIST_MAX_READ_UNITS if page["fill"] else 0,
+    )
+    return {
+        "items": [select_fields(item, fields) for item in items],
+        "lastEvaluatedKey": next_key,
+        "consumedCapacity": consumed,
+    }
+
+
+def search_page(
+    search: Callable[[int, int], Tuple[List[Dict[str, Any]], Optional[int], bool]],
+    page: Dict[str, Any],
+    fields: List[str],
+) -> Dict[str, Any]:
+    """
+    Response body of a list endpoint served from the search index;
+    `search(offset, limit)` is _search.search bound to the request.
+    `truncated` tells the client that only part of the matches were ranked.
+    """
+    offset = int((page["lastKey"] or {}).get("searchOffset", 0))
+    items, next_offset, truncated = search(offset, page["limit"])
+    return {
+        "items": [select_fields(item, fields) for item in items],
+        "lastEvaluatedKey": (
+            {"searchOffset": next_offset} if next_offset is not None else None
+        ),
+        "truncated": truncated,
+    }
+
+
+BATCH_GET_MAX_IDS = int(os.environ.get("BATCH_GET_MAX_IDS", 500))
+
+
+def parse_batch_get(
+    kind: str, body: Dict[str, Any]
+) -> Tuple[Optional[Dict[str, Any]], Optional[str]]:
+    """
+    Parameters shared by the batch-get endpoints: ids (repeats dropped, at
+    most BATCH_GET_MAX_IDS) and fields (default "full"). Returns
+    ({"ids", "fields"}, None) or (None, error message).
+    """
+    ids = body.get("ids")
+    if not isinstance(ids, list) or not ids or not all(isinstance(i, str) and i for i in ids):
+        return None, "ids must be a non-empty list of ids"
+    fields, error = resolve_fields(kind, body.get("fields"), "full")
+    if error:
+        return None, error
+    ids = list(dict.fromkeys(ids))
+    if len(ids) > BATCH_GET_MAX_IDS:
+        return None, f"at most {BATCH_GET_MAX_IDS} ids per request"
+    return {"ids": ids, "fields": fields}, None
+
+
+def batch_get_page(
+    table_name: str, tenant: str, request: Dict[str, Any]
+) -> Dict[str, Any]:
+    """
+    Response body of a batch-get endpoint: items in the order of the ids,
+    ids that don't exist listed in `missing`.
+    """
+    ids = request["ids"]
+    found = {
+        item["id"]: item
+        for item in batch_get_items(
+            table_name, [{"tenant": tenant, "id": i} for i in ids], request["fields"]
+        )
+    }
+    return {
+        "items": [found[i] for i in ids if i in found],
+        "missing": [i for i in ids if i not in found],
+    }
+
+
+def split_token(token: str) -> Optional[Tuple[str, str]]:
+    """(tenant, secret) of a "<tenant>#<secret>" token, None when malformed."""
+    if not isinstance(token, str) or token.count("#") != 1:
+        return None
+    tenant, _, secret = token.partition("#")
+    if not tenant or not secret:
+        return None
+    return tenant, secret
 
 
 def get_token(tenant, token):
     resp = tokens_table.get_item(Key={"tenant": tenant, "id": token})
-    print(resp)
-    item = resp.get("Item")
-    print(item)
-    if not item:
-        return None
-    return item
+    return resp.get("Item")
 
 
 def get_token_data(token):
-    tenant, _ = split_token(token)
-    print(tenant, token)
-    return get_token(tenant, token)
+    parts = split_token(token)
+    if parts is None:
+        return None
+    return get_token(parts[0], token)
 
 
 def build_user_search_key(
@@ -109,3 +581,83 @@ def build_incident_search_key(
         (description or "").lower(),
     ]
     return " ".join(filter(None, tokens))
+
+
+def build_incident_item(
+    body: Dict[str, Any], now: str
+) -> Tuple[Optional[Dict[str, Any]], Optional[str]]:
+    """Validates a create payload: returns (item, None) or (None, error message)."""
+    tenant = body.get("tenant")
+    title = body.get("title")
+    creator = body.get("creator")
+    location = body.get("location")
+    description = body.get("description", "")
+    state = (body.get("state") or "PENDING").upper()
+
+    if state not in VALID_INCIDENT_STATES:
+        return None, f"state must be one of {sorted(VALID_INCIDENT_STATES)}"
+    if not all([tenant, title, creator, location]):
+        return None, "tenant, title, creator and location are required"
+
+    return {
+        "tenant": tenant,
+        "id": body.get("id") or uuid.uuid4().hex,
+        "title": title,
+        "creator": creator,
+        "location": location,
+        "media": body.get("media") or "",
+        "description": description or "",
+        "state": state,
+        "tenantState": build_tenant_state(tenant, state),
+        "createdAt": now,
+        "updatedAt": now,
+        "version": 1,
+        "searchKey": build_incident_search_key(title, location, creator, description),
+    }, None
+
+
+INCIDENT_UPDATABLE_FIELDS = ("title", "location", "media", "state", "description")
+INCIDENT_SEARCH_FIELDS = {"title", "location", "description"}
+
+
+def build_incident_update(
+    tenant: str, body: Dict[str, Any], now: str
+) -> Tuple[Optional[Dict[str, Any]], Optional[str]]:
+    """
+    Turns the updatable fields present in `body` into update_item arguments
+    (UpdateExpression, ExpressionAttributeNames/Values), with updatedAt, a
+    version increment and, on a state change, tenantState. Returns (kwargs, None) or (None, error).
+    """
+    update_expr = []
+    expr_attr_vals: Dict[str, Any] = {}
+    expr_attr_names: Dict[str, str] = {}
+
+    for field in INCIDENT_UPDATABLE_FIELDS:
+        if field not in body:
+            continue
+        if field == "state":
+            state_val = (body[field] or "").upper()
+            if state_val not in VALID_INCIDENT_STATES:
+                return None, f"state must be one of {sorted(VALID_INCIDENT_STATES)}"
+            expr_attr_vals[":state"] = state_val
+            expr_attr_names["#state"] = "state"
+            update_expr.append("#state = :state")
+            expr_attr_vals[":tenant_state"] = build_tenant_state(tenant, state_val)
+            update_expr.append("tenantState = :tenant_state")
+        else:
+            expr_attr_vals[f":{field}"] = body[field]
+            expr_attr_names[f"#{field}"] = field
+            update_expr.append(f"#{field} = :{field}")
+
+    if not update_expr:
+        return None, "no updatable fields provided"
+
+    expr_attr_vals[":updated_at"] = now
+    update_expr.append("updatedAt = :updated_at")
+    expr_attr_names["#version"] = "version"
+    expr_attr_vals[":one"] = 1
+    return {
+        "UpdateExpression": "SET " + ", ".join(update_expr) + " ADD #version :one",
+        "ExpressionAttributeNames": expr_attr_names,
+        "ExpressionAttributeValues": expr_attr_vals,
+    }, None
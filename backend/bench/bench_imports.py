@@ -0,0 +1,61 @@
+# bench/bench_imports.py
+# Cold-start profile of every handler module in a fresh interpreter:
+#  - import: what Lambda runs during init
+#  - +ddb:   the DynamoDB resource built on first use (_utils.get_dynamodb)
+#   cd backend && python bench/bench_imports.py
+import os
+import statistics
+import subprocess
+import sys
+
+BACKEND = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+RUNS = 10
+MODULES = [
+    "mytoken.create",
+    "mytoken.delete",
+    "user.create",
+    "user.get",
+    "user.list",
+    "user.update",
+    "user.delete",
+    "incidents.create",
+    "incidents.get",
+    "incidents.list",
+    "incidents.update",
+    "incidents.delete",
+]
+
+_SNIPPET = """
+import time, importlib
+t0 = time.perf_counter()
+importlib.import_module({module!r})
+t1 = time.perf_counter()
+import _utils
+_utils.get_dynamodb()
+t2 = time.perf_counter()
+print((t1 - t0) * 1000, (t2 - t1) * 1000)
+"""
+
+
+def profile(module_name: str):
+    imports, first_use = [], []
+    for _ in range(RUNS):
+        out = subprocess.run(
+            [sys.executable, "-c", _SNIPPET.format(module=module_name)],
+            cwd=BACKEND,
+            env=dict(os.environ, AWS_DEFAULT_REGION="us-east-1"),
+            capture_output=True,
+            text=True,
+            check=True,
+        )
+        import_ms, ddb_ms = map(float, out.stdout.split())
+        imports.append(import_ms)
+        first_use.append(ddb_ms)
+    return statistics.median(imports), statistics.median(first_use)
+
+
+if __name__ == "__main__":
+    print(f"median of {RUNS} fresh interpreters (ms)")
+    for module_name in MODULES:
+        import_ms, ddb_ms = profile(module_name)
+        print(f"  {module_name:<18} import {import_ms:6.1f}  +ddb {ddb_ms:6.1f}")
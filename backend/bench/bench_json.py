@@ -0,0 +1,53 @@
+# bench/bench_json.py
+# Encoding cost of incident/list pages: stdlib json vs _response.dumps
+# (orjson when installed, Decimal/set/bytes handled natively).
+#   cd backend && python bench/bench_json.py
+import json
+import os
+import sys
+import timeit
+from decimal import Decimal
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("AWS_DEFAULT_REGION", "us-east-1")
+
+import _response  # noqa: E402
+
+
+def _incident(i: int) -> dict:
+    return {
+        "tenant": "UTEC",
+        "id": f"{i:032x}",
+        "title": f"Fuga de agua en el pabellon {i % 7}",
+        "creator": f"user{i % 13}@utec.edu.pe",
+        "location": f"Pabellon {chr(65 + i % 5)} piso {i % 4}",
+        "media": "https://example.com/media/" + "x" * 40,
+        "description": "Se observa una fuga constante cerca del laboratorio. " * 4,
+        "state": ("PENDING", "ATTENDING", "FINISHED")[i % 3],
+        "tenantState": "UTEC#PENDING",
+        "createdAt": "2025-11-15T10:00:00Z",
+        "updatedAt": "2025-11-15T11:00:00Z",
+        "searchKey": "fuga de agua en el pabellon pabellon a piso 1 user@utec.edu.pe",
+        "priority": Decimal(i % 5),
+    }
+
+
+def _stdlib(page):
+    # what handlers did before: json.dumps, which rejects Decimal outright
+    return json.dumps(page, default=str)
+
+
+def main(number=2000):
+    print(f"encoder: {'orjson' if _response.orjson else 'json (orjson missing)'}")
+    for size in (50, 100):
+        page = {"items": [_incident(i) for i in range(size)], "lastEvaluatedKey": None}
+        stdlib = timeit.timeit(lambda: _stdlib(page), number=number) / number
+        fast = timeit.timeit(lambda: _response.dumps(page), number=number) / number
+        print(
+            f"  {size:>3} items  stdlib {stdlib * 1e6:7.1f} us  "
+            f"_response {fast * 1e6:7.1f} us  ({len(_response.dumps(page))} bytes)"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+# bench/bench_router.py
+# Per-function vs single-router mode, measured locally:
+#  - cold: fresh interpreter importing what a new container needs before its
+#    first request (one handler module, or the router plus one handler)
+#  - warm: router dispatch overhead on top of a direct handler call
+#   cd backend && python bench/bench_router.py
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+BACKEND = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND)
+os.environ.setdefault("AWS_DEFAULT_REGION", "us-east-1")
+
+import router  # noqa: E402
+
+COLD_RUNS = 15
+WARM_CALLS = 100_000
+
+_COLD_SNIPPET = """
+import time, importlib
+t = time.perf_counter()
+{body}
+print(time.perf_counter() - t)
+"""
+
+
+def _cold(body: str) -> list:
+    samples = []
+    for _ in range(COLD_RUNS):
+        out = subprocess.run(
+            [sys.executable, "-c", _COLD_SNIPPET.format(body=body)],
+            cwd=BACKEND,
+            env=dict(os.environ),
+            capture_output=True,
+            text=True,
+            check=True,
+        )
+        samples.append(float(out.stdout.strip()) * 1000)
+    return samples
+
+
+def _pct(samples: list, p: float) -> float:
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(round(p / 100 * (len(ordered) - 1))))]
+
+
+def cold_starts():
+    print(f"cold init, {COLD_RUNS} fresh interpreters each (ms)")
+    modules = sorted(set(router.ROUTES.values()))
+    for module_name in modules:
+        samples = _cold(f"importlib.import_module({module_name!r}).lambda_handler")
+        print(
+            f"  per-function {module_name:<18} p50 {statistics.median(samples):6.1f}"
+            f"  p99 {_pct(samples, 99):6.1f}"
+        )
+    samples = _cold(f"import router; router._load({modules[0]!r})")
+    print(
+        f"  router       {'+ ' + modules[0]:<18} p50 {statistics.median(samples):6.1f}"
+        f"  p99 {_pct(samples, 99):6.1f}"
+    )
+    print(f"  containers to warm every route: per-function {len(modules)}, router 1")
+
+
+def warm_dispatch():
+    def noop(event, context):
+        return {"statusCode": 200}
+
+    for module_name in router.ROUTES.values():
+        router._handlers[module_name] = noop
+    event = {"httpMethod": "POST", "path": "/incident/list/"}
+
+    for label, call in (
+        ("direct", lambda: noop(event, None)),
+        ("router", lambda: router.lambda_handler(event, None)),
+    ):
+        samples = []
+        for _ in range(WARM_CALLS):
+            start = time.perf_counter_ns()
+            call()
+            samples.append(time.perf_counter_ns() - start)
+        print(
+            f"  {label:<6} p50 {statistics.median(samples):6.0f} ns"
+            f"  p99 {_pct(samples, 99):6.0f} ns"
+        )
+
+
+if __name__ == "__main__":
+    cold_starts()
+    print(f"warm dispatch, {WARM_CALLS} calls")
+    warm_dispatch()
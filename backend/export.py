@@ -0,0 +1,239 @@
+# export.py
+# Bulk export of incidents or users with a parallel scan: each of --segments
+# workers scans one Segment of the table and streams its items to its own
+# file, so memory stays at one scan page per worker.
+#   cd backend && python export.py incidents --tenant UTEC --out exports/
+#   python export.py users --format parquet --segments 8 --out exports/
+#   DYNAMODB_ENDPOINT_URL=http://localhost:8000 python export.py incidents ...
+# An interrupted export picks up where each segment stopped when re-run with
+# the same arguments (progress is kept in <out>/<name>.checkpoint.json);
+# --restart discards it.
+import argparse
+import gzip
+import json
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional
+
+from _utils import INCIDENTS_TABLE, USERS_TABLE, get_dynamodb
+from _response import dumps
+
+try:  # optional: only needed for --format parquet
+    import pyarrow
+    import pyarrow.parquet
+except ImportError:
+    pyarrow = None
+
+TABLES = {"incidents": INCIDENTS_TABLE, "users": USERS_TABLE}
+
+# never exported: derived index attributes and credentials
+INTERNAL_FIELDS = {"searchKey", "tenantState", "passwordHash", "salt"}
+
+# parquet columns; other attributes are dropped, lists/maps are stored as JSON
+COLUMNS = {
+    "incidents": [
+        "tenant", "id", "title", "creator", "location", "state",
+        "media", "description", "createdAt", "updatedAt",
+    ],
+    "users": [
+        "tenant", "id", "email", "fullName", "roles", "phone",
+        "notes", "status", "createdAt", "updatedAt",
+    ],
+}
+
+# rows per parquet part file; each finished part is one checkpoint
+PARQUET_PART_ROWS = 50_000
+
+class Checkpoint:
+    """
+    Per-segment progress, rewritten atomically after each committed page:
+    {"<segment>": {"lastKey": ..., "offset": ..., "parts": n, "items": n, "done": bool}}
+    """
+
+    def __init__(self, path: str, settings: Dict[str, Any], restart: bool):
+        self.path = path
+        self.lock = threading.Lock()
+        self.state: Dict[str, Any] = {"settings": settings, "segments": {}}
+        if not restart and os.path.exists(path):
+            with open(path) as f:
+                saved = json.load(f)
+            if saved.get("settings") != settings:
+                raise SystemExit(
+                    f"{path} belongs to an export with other settings; use --restart"
+                )
+            self.state = saved
+
+    def segment(self, segment: int) -> Dict[str, Any]:
+        return self.state["segments"].get(
+            str(segment),
+            {"lastKey": None, "offset": 0, "parts": 0, "items": 0, "done": False},
+        )
+
+    def save(self, segment: int, progress: Dict[str, Any]) -> None:
+        with self.lock:
+            self.state["segments"][str(segment)] = progress
+            tmp = self.path + ".tmp"
+            with open(tmp, "w") as f:
+                json.dump(self.state, f)
+            os.replace(tmp, self.path)
+
+
+def _pages(client, scan_kwargs: Dict[str, Any], last_key: Optional[Dict[str, Any]]):
+    """Yields (items, last_key) per scan page, internal fields removed."""
+    kwargs = dict(scan_kwargs)
+    while True:
+        if last_key:
+            kwargs["ExclusiveStartKey"] = last_key
+        resp = client.scan(**kwargs)
+        items = [
+            {k: v for k, v in item.items() if k not in INTERNAL_FIELDS}
+            for item in resp.get("Items", [])
+        ]
+        last_key = resp.get("LastEvaluatedKey")
+        yield items, last_key
+        if not last_key:
+            return
+
+
+def _export_ndjson(client, scan_kwargs, path, progress, checkpoint, segment):
+    # Each page is written as its own gzip member (concatenated members are a
+    # valid gzip stream). The checkpoint records the byte offset after the
+    # last committed page; resuming truncates anything written past it.
+    mode = "r+b" if os.path.exists(path) else "wb"
+    with open(path, mode) as raw:
+        raw.truncate(progress["offset"])
+        raw.seek(progress["offset"])
+        for items, last_key in _pages(client, scan_kwargs, progress["lastKey"]):
+            if items:
+                with gzip.GzipFile(fileobj=raw, mode="wb") as gz:
+                    gz.write("".join(dumps(item) + "\n" for item in items).encode("utf-8"))
+                raw.flush()
+            progress = dict(
+                progress,
+                lastKey=last_key,
+                offset=raw.tell(),
+                items=progress["items"] + len(items),
+                done=last_key is None,
+            )
+            checkpoint.save(segment, progress)
+    return progress
+
+
+def _column_value(value: Any) -> Optional[str]:
+    if value is None or isinstance(value, str):
+        return value
+    return dumps(value)
+
+
+def _export_parquet(client, scan_kwargs, path, progress, checkpoint, segment, columns):
+    # Parquet files can't be appended to, so a segment is written as numbered
+    # part files; the checkpoint advances when a part is closed and a resumed
+    # run rewrites the part that was in progress.
+    schema = pyarrow.schema([(c, pyarrow.string()) for c in columns])
+    pages = _pages(client, scan_kwargs, progress["lastKey"])
+    while not progress["done"]:
+        part_path = f"{path}.part{progress['parts']:04d}.parquet"
+        rows = 0
+        last_key = progress["lastKey"]
+        with pyarrow.parquet.ParquetWriter(part_path, schema, compression="zstd") as writer:
+            for items, last_key in pages:
+                if items:
+                    writer.write_table(
+                        pyarrow.table(
+                            {c: [_column_value(i.get(c)) for i in items] for c in columns},
+                            schema=schema,
+                        )
+                    )
+                    rows += len(items)
+                if not last_key or rows >= PARQUET_PART_ROWS:
+                    break
+        progress = dict(
+            progress,
+            lastKey=last_key,
+            parts=progress["parts"] + 1,
+            items=progress["items"] + rows,
+            done=last_key is None,
+        )
+        checkpoint.save(segment, progress)
+    return progress
+
+
+def export_segment(args, checkpoint: Checkpoint, segment: int) -> Dict[str, Any]:
+    progress = checkpoint.segment(segment)
+    if progress["done"]:
+        return progress
+
+    # the resource's client is thread-safe and (de)serializes like a Table
+    client = get_dynamodb().meta.client
+    scan_kwargs: Dict[str, Any] = {
+        "TableName": TABLES[args.kind],
+        "Segment": segment,
+        "TotalSegments": args.segments,
+        "Limit": args.page_size,
+    }
+    if args.tenant:
+        scan_kwargs["FilterExpression"] = "#tenant = :tenant"
+        scan_kwargs["ExpressionAttributeNames"] = {"#tenant": "tenant"}
+        scan_kwargs["ExpressionAttributeValues"] = {":tenant": args.tenant}
+
+    path = os.path.join(args.out, f"{args.name}-{segment:04d}-of-{args.segments:04d}")
+    if args.format == "parquet":
+        return _export_parquet(
+            client, scan_kwargs, path, progress, checkpoint, segment, COLUMNS[args.kind]
+        )
+    return _export_ndjson(client, scan_kwargs, path + ".ndjson.gz", progress, checkpoint, segment)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Parallel scan export of incidents or users")
+    parser.add_argument("kind", choices=sorted(TABLES))
+    parser.add_argument("--tenant", help="only this tenant's items")
+    parser.add_argument("--format", choices=("ndjson", "parquet"), default="ndjson")
+    parser.add_argument("--segments", type=int, default=4)
+    parser.add_argument("--page-size", type=int, default=1000)
+    parser.add_argument("--out", default="exports")
+    parser.add_argument("--name", help="file prefix (default: <kind>[-<tenant>])")
+    parser.add_argument("--restart", action="store_true", help="ignore the checkpoint")
+    args = parser.parse_args(argv)
+
+    if args.format == "parquet" and pyarrow is None:
+        print("--format parquet needs pyarrow (pip install pyarrow)", file=sys.stderr)
+        return 2
+    args.name = args.name or "-".join(filter(None, [args.kind, args.tenant]))
+    os.makedirs(args.out, exist_ok=True)
+
+    settings = {
+        "kind": args.kind,
+        "tenant": args.tenant,
+        "format": args.format,
+        "segments": args.segments,
+    }
+    checkpoint = Checkpoint(
+        os.path.join(args.out, f"{args.name}.checkpoint.json"), settings, args.restart
+    )
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.segments) as pool:
+        results = list(
+            pool.map(lambda s: export_segment(args, checkpoint, s), range(args.segments))
+        )
+    print(
+        json.dumps(
+            {
+                "kind": args.kind,
+                "tenant": args.tenant,
+                "format": args.format,
+                "segments": args.segments,
+                "items": sum(r["items"] for r in results),
+                "seconds": round(time.perf_counter() - started, 2),
+            }
+        )
+    )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
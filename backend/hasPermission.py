@@ -1,7 +1,12 @@
 # hasPermission.py
-from typing import Dict, Any, Callable, Optional
-from _utils import get_token_data, CORS_HEADERS
+from collections import OrderedDict
+from functools import lru_cache
+from typing import Dict, Any, Callable, Optional, Tuple
+from _utils import get_token_data, split_token, CORS_HEADERS
+from _tokens import is_signed_token, verify_signed_token, RevocationUnavailable
+import json
 import os
+import time
 
 Action = str  # "view" | "create" | "update" | "delete"
 Role = str  # "reporter" | "admin" | "attendant"
@@ -12,6 +17,21 @@ STAGE = os.environ.get("STAGE", "")
 
 PermissionCheck = Callable[[User, Any], bool]
 
+# Per-container token cache. A token deleted in another container stays valid
+# here for at most TOKEN_CACHE_TTL_SECONDS (the revocation staleness window);
+# unknown tokens are remembered for TOKEN_NEGATIVE_TTL_SECONDS.
+TOKEN_CACHE_SIZE = int(os.environ.get("TOKEN_CACHE_SIZE", 1024))
+TOKEN_CACHE_TTL_SECONDS = float(os.environ.get("TOKEN_CACHE_TTL_SECONDS", 60))
+TOKEN_NEGATIVE_TTL_SECONDS = float(os.environ.get("TOKEN_NEGATIVE_TTL_SECONDS", 10))
+
+_token_cache: "OrderedDict[str, Tuple[float, Optional[Dict]]]" = OrderedDict()
+_token_cache_stats = {"hits": 0, "misses": 0, "evictions": 0}
+# the counters are logged as one {"tokenCacheStats": ...} line per interval
+TOKEN_CACHE_STATS_INTERVAL_SECONDS = float(
+    os.environ.get("TOKEN_CACHE_STATS_INTERVAL_SECONDS", 60)
+)
+_token_cache_stats_logged_at = time.monotonic()
+
 
 ROLES = {
     "admin": {
@@ -33,17 +53,60 @@ ARN_ACTION = {
     "POST/auth/token/delete": ("tokens", "delete"),
     "POST/auth/user/create": ("users", "create"),
     "POST/auth/user/get": ("users", "view"),
+    "POST/auth/user/batch-get": ("users", "view"),
     "POST/auth/user/list": ("users", "view"),
     "PUT/auth/user/update": ("users", "update"),
     "POST/auth/user/delete": ("users", "delete"),
     "POST/incident/create": ("incidents", "create"),
+    "POST/incident/batch-create": ("incidents", "create"),
     "POST/incident/get": ("incidents", "view"),
+    "POST/incident/batch-get": ("incidents", "view"),
     "POST/incident/list": ("incidents", "view"),
+    "POST/incident/summary": ("incidents", "view"),
     "PUT/incident/update": ("incidents", "update"),
+    "PUT/incident/batch-update": ("incidents", "update"),
     "POST/incident/delete": ("incidents", "delete"),
 }
 
 
+def _compile_permissions():
+    """
+    Assigns one bit per (resource, action) pair and folds ROLES into an
+    integer mask per role. Callable permissions can't be precomputed and are
+    kept aside, keyed by role, for the data-dependent fallback.
+    """
+    bits: Dict[Tuple[str, str], int] = {}
+    for resource, action in ARN_ACTION.values():
+        bits.setdefault((resource, action), 1 << len(bits))
+    masks: Dict[Role, int] = {}
+    callables: Dict[Tuple[str, str], list] = {}
+    for role, role_cfg in ROLES.items():
+        mask = 0
+        for resource, res_cfg in role_cfg.items():
+            for action, permission in res_cfg.items():
+                bit = bits.setdefault((resource, action), 1 << len(bits))
+                if permission is True:
+                    mask |= bit
+                elif callable(permission):
+                    callables.setdefault((resource, action), []).append(
+                        (role, permission)
+                    )
+        masks[role] = mask
+    routes = {arn_key: bits[mapping] for arn_key, mapping in ARN_ACTION.items()}
+    return bits, masks, callables, routes
+
+
+PERMISSION_BITS, ROLE_MASKS, CALLABLE_PERMISSIONS, ROUTE_BITS = _compile_permissions()
+
+
+@lru_cache(maxsize=256)
+def roles_mask(roles: Tuple[Role, ...]) -> int:
+    mask = 0
+    for role in roles:
+        mask |= ROLE_MASKS.get(role, 0)
+    return mask
+
+
 def validate_permission(
     user: User, resource: str, action: str, data: Optional[Dict] = None
 ) -> bool:
@@ -51,35 +114,73 @@ def validate_permission(
     Returns True if the user has permission to perform `action` on `resource`.
     `user` is expected to have a 'roles' field that's a list of role names.
     """
-    roles = user.get("roles", [])
-    for role in roles:
-        role_cfg = ROLES.get(role)
-        if not role_cfg:
+    roles = tuple(user.get("roles", []))
+    bit = PERMISSION_BITS.get((resource, action), 0)
+    if roles_mask(roles) & bit:
+        return True
+    # callable permission
+    if data is None:
+        # data required for callable permission checks
+        return False
+    for role, permission in CALLABLE_PERMISSIONS.get((resource, action), ()):
+        if role not in roles:
             continue
-        res_cfg = role_cfg.get(resource)
-        if not res_cfg:
-            continue
-        permission = res_cfg.get(action)
-        if permission is None:
-            continue
-        if isinstance(permission, bool):
-            if permission:
+        try:
+            if permission(user, data):
                 return True
-            else:
-                continue
-        # callable permission
-        if callable(permission):
-            if data is None:
-                # data required for callable permission checks
-                continue
-            try:
-                if permission(user, data):
-                    return True
-            except Exception:
-                continue
+        except Exception:
+            continue
     return False
 
 
+def get_cached_token_data(token: str) -> Optional[Dict]:
+    now = time.time()
+    entry = _token_cache.get(token)
+    if entry is not None:
+        expires, data = entry
+        if expires > now:
+            _token_cache.move_to_end(token)
+            _token_cache_stats["hits"] += 1
+            return data
+        del _token_cache[token]
+    _token_cache_stats["misses"] += 1
+
+    data = get_token_data(token)
+    token_expires = float(data.get("expiresAt") or 0) if data else 0
+    if data and token_expires <= now:
+        # DynamoDB TTL deletes lazily, expired tokens can still be read
+        data = None
+    if data:
+        expires = min(now + TOKEN_CACHE_TTL_SECONDS, token_expires)
+    else:
+        expires = now + TOKEN_NEGATIVE_TTL_SECONDS
+
+    _token_cache[token] = (expires, data)
+    _token_cache.move_to_end(token)
+    while len(_token_cache) > TOKEN_CACHE_SIZE:
+        _token_cache.popitem(last=False)
+        _token_cache_stats["evictions"] += 1
+    return data
+
+
+def invalidate_token(token: str) -> None:
+    _token_cache.pop(token, None)
+
+
+def token_cache_stats() -> Dict[str, int]:
+    return dict(_token_cache_stats, size=len(_token_cache))
+
+
+def _log_token_cache_stats() -> None:
+    global _token_cache_stats_logged_at
+    now = time.monotonic()
+    if now - _token_cache_stats_logged_at < TOKEN_CACHE_STATS_INTERVAL_SECONDS:
+        return
+    _token_cache_stats_logged_at = now
+    # counters are cumulative for the container; a metric filter can chart them
+    print(json.dumps({"tokenCacheStats": token_cache_stats()}))
+
+
 def has_permission(event, context):
     """
     event is expected to be a regular HTTP Lambda event
@@ -93,21 +194,29 @@ def has_permission(event, context):
         return 401
 
     token = auth_header[len("Bearer ") :]
+    if split_token(token) is None:
+        return 401
     method = (event.get("httpMethod") or "").upper()
     path = (event.get("path") or "").strip("/")
     arn_key = f"{method}/{path}"
 
-    mapping = ARN_ACTION.get(arn_key)
-    if not mapping:
+    bit = ROUTE_BITS.get(arn_key)
+    if not bit:
         print("No ARN mapping for key", arn_key)
         return 500
 
-    resource, action = mapping
-
-    data = get_token_data(token)
+    if is_signed_token(token):
+        try:
+            data = verify_signed_token(token)
+        except RevocationUnavailable:
+            return 503
+    else:
+        data = get_cached_token_data(token)
+        _log_token_cache_stats()
     if not data:
         return 401
 
-    allowed = validate_permission(data.get("user"), resource, action)
-    print("AUTHORIZED", allowed)
+    roles = tuple((data.get("user") or {}).get("roles", []))
+    if not roles_mask(roles) & bit:
+        return 403
     return 200
@@ -0,0 +1,36 @@
+# incident/backfill_index.py
+import json
+
+from _utils import incidents_table, build_tenant_state, run_backfill
+from _search import reindex
+
+
+def lambda_handler(event, context):
+    """
+    Migration and repair for incidents: sets `tenantState` where missing and
+    (re)writes search postings. {"tenant"?, "exclusiveStartKey"?}; when the
+    response has an exclusiveStartKey, invoke again with it to continue.
+    """
+    counts = {"updated": 0, "indexed": 0}
+
+    def process(items):
+        for item in items:
+            if "tenantState" in item:
+                continue
+            incidents_table.update_item(
+                Key={"tenant": item["tenant"], "id": item["id"]},
+                UpdateExpression="SET tenantState = :ts",
+                ExpressionAttributeValues={
+                    ":ts": build_tenant_state(
+                        item["tenant"], item.get("state") or "PENDING"
+                    )
+                },
+            )
+            counts["updated"] += 1
+        counts["indexed"] += reindex("incident", items)
+
+    last_key = run_backfill(incidents_table, event, context, process)
+    return {
+        "statusCode": 200,
+        "body": json.dumps(dict(counts, exclusiveStartKey=last_key)),
+    }
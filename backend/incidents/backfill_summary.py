@@ -0,0 +1,47 @@
+# incident/backfill_summary.py
+import json
+
+from boto3.dynamodb.conditions import Key
+
+from _utils import incidents_table
+from _summary import rebuild
+
+
+def _tenant_incidents(tenant):
+    # consistent: every change the stream applied before the summary version
+    # rebuild() read must be in here
+    kwargs = {"KeyConditionExpression": Key("tenant").eq(tenant), "ConsistentRead": True}
+    while True:
+        resp = incidents_table.query(**kwargs)
+        yield from resp.get("Items", [])
+        last_key = resp.get("LastEvaluatedKey")
+        if not last_key:
+            return
+        kwargs["ExclusiveStartKey"] = last_key
+
+
+def _all_tenants():
+    tenants = set()
+    scan_kwargs = {"ProjectionExpression": "tenant"}
+    while True:
+        resp = incidents_table.scan(**scan_kwargs)
+        tenants.update(item["tenant"] for item in resp.get("Items", []))
+        last_key = resp.get("LastEvaluatedKey")
+        if not last_key:
+            return sorted(tenants)
+        scan_kwargs["ExclusiveStartKey"] = last_key
+
+
+def lambda_handler(event, context):
+    """
+    Rebuilds incident summaries from IncidentsTable: {"tenant": "..."} for
+    one tenant, or every tenant when omitted. Run it once after deploying the
+    summary stream and whenever a summary is suspected to have drifted.
+    """
+    tenant = (event or {}).get("tenant")
+    tenants = [tenant] if tenant else _all_tenants()
+    totals = {}
+    for t in tenants:
+        totals[t] = rebuild(t, lambda: _tenant_incidents(t))["total"]
+
+    return {"statusCode": 200, "body": json.dumps({"rebuilt": totals})}
@@ -0,0 +1,121 @@
+# incident/batch_create.py
+import json
+import os
+
+from _utils import (
+    INCIDENTS_TABLE,
+    batch_get_items,
+    batch_put_items,
+    build_incident_item,
+    bump_version_stamp,
+    now_iso,
+)
+from _response import json_response
+from _search import index_documents
+from hasPermission import has_permission
+
+BATCH_CREATE_MAX_ITEMS = int(os.environ.get("BATCH_CREATE_MAX_ITEMS", 1000))
+
+
+def lambda_handler(event, context):
+    """
+    {"incidents": [{...create payload...}, ...]}
+    Validates every incident, writes the valid ones with BatchWriteItem and
+    answers with one result per input position:
+    {"index", "id", "status": 201 | 400 | 500, "message"?}. A 201 whose search
+    postings could not be written also carries "indexed": false.
+    """
+    code = has_permission(event, context)
+    if code != 200:
+        return json_response(code, {"message": "forbidden"})
+
+    body = event.get("body")
+    if isinstance(body, str):
+        body = json.loads(body)
+
+    incidents = body.get("incidents")
+    if not isinstance(incidents, list) or not incidents:
+        return json_response(400, {"message": "incidents must be a non-empty list"})
+    if len(incidents) > BATCH_CREATE_MAX_ITEMS:
+        return json_response(
+            400, {"message": f"at most {BATCH_CREATE_MAX_ITEMS} incidents per request"}
+        )
+
+    now = now_iso()
+    results = [None] * len(incidents)
+    valid = []  # (index, item)
+    seen = set()
+    for index, payload in enumerate(incidents):
+        if not isinstance(payload, dict):
+            results[index] = {"index": index, "status": 400, "message": "must be an object"}
+            continue
+        item, error = build_incident_item(payload, now)
+        if error:
+            results[index] = {"index": index, "status": 400, "message": error}
+            continue
+        key = (item["tenant"], item["id"])
+        if key in seen:
+            results[index] = {
+                "index": index,
+                "id": item["id"],
+                "status": 400,
+                "message": "duplicate id in request",
+            }
+            continue
+        seen.add(key)
+        valid.append((index, item))
+
+    try:
+        # caller-chosen ids may replace existing incidents, whose search
+        # postings must move like in incident/create
+        explicit = [
+            {"tenant": item["tenant"], "id": item["id"]}
+            for index, item in valid
+            if incidents[index].get("id")
+        ]
+        previous = {
+            (old["tenant"], old["id"]): old.get("searchKey")
+            for old in (batch_get_items(INCIDENTS_TABLE, explicit) if explicit else [])
+        }
+
+        failures = batch_put_items(INCIDENTS_TABLE, [item for _, item in valid])
+    except Exception as e:
+        return json_response(500, {"message": "internal error", "error": str(e)})
+    failed = {(item["tenant"], item["id"]): error for item, error in failures}
+
+    written = []
+    for index, item in valid:
+        key = (item["tenant"], item["id"])
+        if key in failed:
+            results[index] = {
+                "index": index,
+                "id": item["id"],
+                "status": 500,
+                "message": failed[key],
+            }
+            continue
+        results[index] = {"index": index, "id": item["id"], "status": 201}
+        written.append((index, item, previous.get(key)))
+
+    # The incidents are stored from here on: indexing problems are reported
+    # on their results ("indexed": false, repaired by incident-backfill-index)
+    # instead of turning the whole response into an error.
+    try:
+        unindexed = index_documents(
+            "incident",
+            [(item["tenant"], item["id"], old, item["searchKey"]) for _, item, old in written],
+        )
+    except Exception as e:
+        unindexed = {(item["tenant"], item["id"]): str(e) for _, item, _ in written}
+    for index, item, _ in written:
+        error = unindexed.get((item["tenant"], item["id"]))
+        if error:
+            results[index].update(indexed=False, message=f"not indexed for search: {error}")
+    for tenant in sorted({item["tenant"] for _, item, _ in written}):
+        bump_version_stamp("incident", tenant)
+
+    created = sum(1 for r in results if r["status"] == 201)
+    return json_response(
+        200,
+        {"created": created, "failed": len(results) - created, "results": results},
+    )
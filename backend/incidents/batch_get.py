@@ -0,0 +1,33 @@
+# incident/batch_get.py
+import json
+
+from _utils import INCIDENTS_TABLE, batch_get_page, parse_batch_get
+from _response import json_response
+from hasPermission import has_permission
+
+
+def lambda_handler(event, context):
+    """
+    {"tenant", "ids": [...], "fields"?: ["title", "state"] | "summary" | "full"}
+    Items come back in the order of `ids` (repeated ids once); ids that don't
+    exist are listed in `missing`.
+    """
+    code = has_permission(event, context)
+    if code != 200:
+        return json_response(code, {"message": "forbidden"})
+
+    body = event.get("body")
+    if isinstance(body, str):
+        body = json.loads(body)
+
+    tenant = body.get("tenant")
+    if not tenant:
+        return json_response(400, {"message": "tenant required"})
+    request, error = parse_batch_get("incident", body)
+    if error:
+        return json_response(400, {"message": error})
+
+    try:
+        return json_response(200, batch_get_page(INCIDENTS_TABLE, tenant, request))
+    except Exception as e:
+        return json_response(500, {"message": "internal error", "error": str(e)})
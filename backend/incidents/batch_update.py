@@ -0,0 +1,219 @@
+# incident/batch_update.py
+import json
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+from boto3.dynamodb.types import TypeDeserializer
+from botocore.exceptions import ClientError
+
+from _utils import (
+    INCIDENTS_TABLE,
+    BATCH_WRITE_CONCURRENCY,
+    INCIDENT_SEARCH_FIELDS,
+    VALID_INCIDENT_STATES,
+    build_incident_search_key,
+    build_incident_update,
+    bump_version_stamp,
+    get_dynamodb,
+    incidents_table,
+    now_iso,
+)
+from _response import json_response
+from _search import sync_search_key
+from hasPermission import has_permission
+
+BATCH_UPDATE_MAX_IDS = int(os.environ.get("BATCH_UPDATE_MAX_IDS", 500))
+TRANSACTION_MAX_ITEMS = 100
+
+deserializer = TypeDeserializer()
+
+
+def _condition(update, from_state):
+    """Every item must exist; with fromState it must also be in that state."""
+    if not from_state:
+        return "attribute_exists(id)"
+    update["ExpressionAttributeNames"]["#state"] = "state"
+    update["ExpressionAttributeValues"][":from_state"] = from_state
+    return "attribute_exists(id) AND #state = :from_state"
+
+
+def _failure(incident_id, old):
+    # ALL_OLD of a failed condition tells a missing item from a state mismatch;
+    # error responses skip boto3's deserialization, so it is still typed
+    if not old:
+        return {"id": incident_id, "status": 404, "message": "incident not found"}
+    state = deserializer.deserialize(old["state"]) if "state" in old else None
+    return {
+        "id": incident_id,
+        "status": 409,
+        "message": f"incident is {state}",
+        "state": state,
+    }
+
+
+def _sync_search(tenant, result, updated):
+    """
+    Moves the search postings of an updated incident. A failure leaves the
+    write applied and marks only this item's result `searchIndexStale`.
+    """
+    try:
+        if updated is None:
+            updated = incidents_table.get_item(
+                Key={"tenant": tenant, "id": result["id"]},
+                ConsistentRead=True,
+            ).get("Item")
+            if not updated:
+                return
+        sync_search_key(
+            incidents_table,
+            "incident",
+            updated,
+            build_incident_search_key(
+                updated.get("title", ""),
+                updated.get("location", ""),
+                updated.get("creator", ""),
+                updated.get("description", ""),
+            ),
+        )
+    except Exception as e:
+        print("search index sync failed", result["id"], e)
+        result["searchIndexStale"] = True
+
+
+def _update_one(client, tenant, incident_id, update, condition, sync):
+    try:
+        resp = client.update_item(
+            TableName=INCIDENTS_TABLE,
+            Key={"tenant": tenant, "id": incident_id},
+            ConditionExpression=condition,
+            ReturnValues="ALL_NEW",
+            ReturnValuesOnConditionCheckFailure="ALL_OLD",
+            **update,
+        )
+    except ClientError as e:
+        if e.response["Error"]["Code"] != "ConditionalCheckFailedException":
+            return {"id": incident_id, "status": 500, "message": str(e)}
+        return _failure(incident_id, e.response.get("Item"))
+    except Exception as e:
+        return {"id": incident_id, "status": 500, "message": str(e)}
+    result = {"id": incident_id, "status": 200}
+    if sync:
+        _sync_search(tenant, result, resp["Attributes"])
+    return result
+
+
+def _update_parallel(tenant, ids, update, condition, sync):
+    client = get_dynamodb().meta.client  # thread-safe, (de)serializes like a Table
+    with ThreadPoolExecutor(max_workers=BATCH_WRITE_CONCURRENCY) as pool:
+        return list(
+            pool.map(
+                lambda i: _update_one(client, tenant, i, update, condition, sync), ids
+            )
+        )
+
+
+def _update_atomic(tenant, ids, update, condition, sync):
+    """All ids in one TransactWriteItems: every item is updated or none is."""
+    client = get_dynamodb().meta.client
+    try:
+        client.transact_write_items(
+            TransactItems=[
+                {
+                    "Update": dict(
+                        update,
+                        TableName=INCIDENTS_TABLE,
+                        Key={"tenant": tenant, "id": incident_id},
+                        ConditionExpression=condition,
+                        ReturnValuesOnConditionCheckFailure="ALL_OLD",
+                    )
+                }
+                for incident_id in ids
+            ]
+        )
+    except ClientError as e:
+        if e.response["Error"]["Code"] != "TransactionCanceledException":
+            raise
+        outcomes = []
+        reasons = e.response.get("CancellationReasons") or [{}] * len(ids)
+        for incident_id, reason in zip(ids, reasons):
+            if reason.get("Code") == "ConditionalCheckFailed":
+                outcomes.append(_failure(incident_id, reason.get("Item")))
+            else:
+                outcomes.append(
+                    {
+                        "id": incident_id,
+                        "status": 409,
+                        "message": "not applied: transaction cancelled",
+                    }
+                )
+        return outcomes
+    results = [{"id": incident_id, "status": 200} for incident_id in ids]
+    if sync:
+        # transactions return no images; each item is read back for the sync
+        with ThreadPoolExecutor(max_workers=BATCH_WRITE_CONCURRENCY) as pool:
+            list(pool.map(lambda r: _sync_search(tenant, r, None), results))
+    return results
+
+
+def lambda_handler(event, context):
+    """
+    {"tenant", "ids": [...], "state": "FINISHED", "fromState"?: "ATTENDING",
+     "title"? ..., "atomic"?: false}
+    Applies one change to many incidents after a single permission check.
+    Items are updated in parallel and reported one by one (200, 404, 409 when
+    not in fromState, 500); with "atomic" (at most 100 ids) they go in one
+    transaction and either all change or none does. An updated item whose
+    search postings could not be moved carries "searchIndexStale": true.
+    """
+    code = has_permission(event, context)
+    if code != 200:
+        return json_response(code, {"message": "forbidden"})
+
+    body = event.get("body")
+    if isinstance(body, str):
+        body = json.loads(body)
+
+    tenant = body.get("tenant")
+    ids = body.get("ids")
+    atomic = bool(body.get("atomic"))
+    if not tenant:
+        return json_response(400, {"message": "tenant required"})
+    if not isinstance(ids, list) or not ids or not all(isinstance(i, str) and i for i in ids):
+        return json_response(400, {"message": "ids must be a non-empty list of ids"})
+    ids = list(dict.fromkeys(ids))
+    limit = TRANSACTION_MAX_ITEMS if atomic else BATCH_UPDATE_MAX_IDS
+    if len(ids) > limit:
+        return json_response(400, {"message": f"at most {limit} ids per request"})
+
+    from_state = (body.get("fromState") or "").upper() or None
+    if from_state and from_state not in VALID_INCIDENT_STATES:
+        return json_response(
+            400, {"message": f"fromState must be one of {sorted(VALID_INCIDENT_STATES)}"}
+        )
+    changes = {k: v for k, v in body.items() if k not in ("tenant", "id", "ids")}
+    update, error = build_incident_update(tenant, changes, now_iso())
+    if error:
+        return json_response(400, {"message": error})
+    condition = _condition(update, from_state)
+
+    # searchKey only depends on text fields; pure state moves skip the sync
+    sync = bool(INCIDENT_SEARCH_FIELDS & set(changes))
+    try:
+        if atomic:
+            results = _update_atomic(tenant, ids, update, condition, sync)
+        else:
+            results = _update_parallel(tenant, ids, update, condition, sync)
+    except Exception as e:
+        return json_response(500, {"message": "internal error", "error": str(e)})
+
+    updated_count = sum(1 for r in results if r["status"] == 200)
+    if updated_count:
+        bump_version_stamp("incident", tenant)
+    return json_response(
+        200,
+        {
+            "updated": updated_count,
+            "failed": len(results) - updated_count,
+            "results": results,
+        },
+    )
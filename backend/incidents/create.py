@@ -1,83 +1,47 @@
 # incident/create.py
 import json
-import uuid
 
 from _utils import (
     incidents_table,
     now_iso,
-    CORS_HEADERS,
-    VALID_INCIDENT_STATES,
-    build_incident_search_key,
+    build_incident_item,
+    bump_version_stamp,
+    select_fields,
+    RESPONSE_FIELDS,
 )
+from _response import json_response
+from _search import index_document
 from hasPermission import has_permission
 
 
 def lambda_handler(event, context):
     code = has_permission(event, context)
     if code != 200:
-        return {
-            "statusCode": code,
-            "headers": CORS_HEADERS,
-            "body": json.dumps({"message": "forbidden"}),
-        }
+        return json_response(code, {"message": "forbidden"})
 
     body = event.get("body")
     if isinstance(body, str):
         body = json.loads(body)
 
-    tenant = body.get("tenant")
-    title = body.get("title")
-    creator = body.get("creator")
-    location = body.get("location")
-    media = body.get("media", "")
-    description = body.get("description", "")
-    state = (body.get("state") or "PENDING").upper()
-
-    if state not in VALID_INCIDENT_STATES:
-        return {
-            "statusCode": 400,
-            "body": json.dumps(
-                {"message": f"state must be one of {sorted(VALID_INCIDENT_STATES)}"}
-            ),
-            "headers": CORS_HEADERS,
-        }
-
-    if not all([tenant, title, creator, location]):
-        return {
-            "statusCode": 400,
-            "body": json.dumps(
-                {"message": "tenant, title, creator and location are required"}
-            ),
-            "headers": CORS_HEADERS,
-        }
-
-    incident_id = body.get("id") or uuid.uuid4().hex
-    now = now_iso()
-
-    item = {
-        "tenant": tenant,
-        "id": incident_id,
-        "title": title,
-        "creator": creator,
-        "location": location,
-        "media": media or "",
-        "description": description or "",
-        "state": state,
-        "createdAt": now,
-        "updatedAt": now,
-        "searchKey": build_incident_search_key(title, location, creator, description),
-    }
+    item, error = build_incident_item(body, now_iso())
+    if error:
+        return json_response(400, {"message": error})
+    tenant = item["tenant"]
+    incident_id = item["id"]
 
     try:
-        incidents_table.put_item(Item=item)
-        return {
-            "statusCode": 201,
-            "body": json.dumps(item),
-            "headers": CORS_HEADERS,
-        }
+        resp = incidents_table.put_item(Item=item, ReturnValues="ALL_OLD")
+        previous = resp.get("Attributes") or {}
+        index_document(
+            tenant,
+            "incident",
+            incident_id,
+            previous.get("searchKey"),
+            item["searchKey"],
+        )
+        bump_version_stamp("incident", tenant)
+        return json_response(
+            201, select_fields(item, RESPONSE_FIELDS["incident"]["full"])
+        )
     except Exception as e:
-        return {
-            "statusCode": 500,
-            "body": json.dumps({"message": "internal error", "error": str(e)}),
-            "headers": CORS_HEADERS,
-        }
+        return json_response(500, {"message": "internal error", "error": str(e)})
@@ -1,18 +1,16 @@
 # incident/delete.py
 import json
 
-from _utils import incidents_table, CORS_HEADERS
+from _utils import incidents_table, bump_version_stamp
+from _response import json_response
+from _search import index_document
 from hasPermission import has_permission
 
 
 def lambda_handler(event, context):
     code = has_permission(event, context)
     if code != 200:
-        return {
-            "statusCode": code,
-            "headers": CORS_HEADERS,
-            "body": json.dumps({"message": "forbidden"}),
-        }
+        return json_response(code, {"message": "forbidden"})
 
     body = event.get("body")
     if isinstance(body, str):
@@ -22,28 +20,20 @@ def lambda_handler(event, context):
     incident_id = body.get("id")
 
     if not tenant:
-        return {
-            "statusCode": 400,
-            "body": json.dumps({"message": "tenant required"}),
-            "headers": CORS_HEADERS,
-        }
+        return json_response(400, {"message": "tenant required"})
     if not incident_id:
-        return {
-            "statusCode": 400,
-            "body": json.dumps({"message": "id required"}),
-            "headers": CORS_HEADERS,
-        }
+        return json_response(400, {"message": "id required"})
 
     try:
-        incidents_table.delete_item(Key={"tenant": tenant, "id": incident_id})
-        return {
-            "statusCode": 200,
-            "body": json.dumps({"message": "deleted"}),
-            "headers": CORS_HEADERS,
-        }
+        resp = incidents_table.delete_item(
+            Key={"tenant": tenant, "id": incident_id}, ReturnValues="ALL_OLD"
+        )
+        previous = resp.get("Attributes")
+        if previous:
+            index_document(
+                tenant, "incident", incident_id, previous.get("searchKey"), None
+            )
+            bump_version_stamp("incident", tenant)
+        return json_response(200, {"message": "deleted"})
     except Exception as e:
-        return {
-            "statusCode": 500,
-            "body": json.dumps({"message": "internal error", "error": str(e)}),
-            "headers": CORS_HEADERS,
-        }
+        return json_response(500, {"message": "internal error", "error": str(e)})
@@ -1,18 +1,26 @@
 # incident/get.py
 import json
 
-from _utils import CORS_HEADERS, get_incident
+from _utils import (
+    get_incident,
+    resolve_fields,
+    select_fields,
+)
+from _response import etag, etag_matches, if_none_match, json_response, not_modified
 from hasPermission import has_permission
 
 
+def _item_etag(item, fields):
+    # updatedAt too: a create that replaces an incident restarts version at 1
+    return etag(
+        "incident", item.get("version", 0), item.get("updatedAt"), fields
+    )
+
+
 def lambda_handler(event, context):
     code = has_permission(event, context)
     if code != 200:
-        return {
-            "statusCode": code,
-            "headers": CORS_HEADERS,
-            "body": json.dumps({"message": "forbidden"}),
-        }
+        return json_response(code, {"message": "forbidden"})
 
     body = event.get("body")
     if isinstance(body, str):
@@ -22,34 +30,26 @@ def lambda_handler(event, context):
     incident_id = body.get("id")
 
     if not tenant:
-        return {
-            "statusCode": 400,
-            "body": json.dumps({"message": "tenant required"}),
-            "headers": CORS_HEADERS,
-        }
+        return json_response(400, {"message": "tenant required"})
     if not incident_id:
-        return {
-            "statusCode": 400,
-            "body": json.dumps({"message": "id required"}),
-            "headers": CORS_HEADERS,
-        }
+        return json_response(400, {"message": "id required"})
+    fields, error = resolve_fields("incident", body.get("fields"), "full")
+    if error:
+        return json_response(400, {"message": error})
 
     try:
-        incident = get_incident(tenant, incident_id)
+        tags = if_none_match(event)
+        incident = get_incident(
+            tenant,
+            incident_id,
+            list(dict.fromkeys(fields + ["version", "updatedAt"])),
+            consistent=bool(tags),  # see if_none_match
+        )
         if not incident:
-            return {
-                "statusCode": 404,
-                "body": json.dumps({"message": "not found"}),
-                "headers": CORS_HEADERS,
-            }
-        return {
-            "statusCode": 200,
-            "body": json.dumps(incident),
-            "headers": CORS_HEADERS,
-        }
+            return json_response(404, {"message": "not found"})
+        tag = _item_etag(incident, fields)
+        if etag_matches(tags, tag):
+            return not_modified(tag)
+        return json_response(200, select_fields(incident, fields), {"ETag": tag})
     except Exception as e:
-        return {
-            "statusCode": 500,
-            "body": json.dumps({"message": "internal error", "error": str(e)}),
-            "headers": CORS_HEADERS,
-        }
+        return json_response(500, {"message": "internal error", "error": str(e)})
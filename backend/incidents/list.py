@@ -1,21 +1,30 @@
 # incident/list.py
 import json
-from typing import Any, Dict
 
-from boto3.dynamodb.conditions import Attr
+from boto3.dynamodb.conditions import Attr, Key
 
-from _utils import CORS_HEADERS, incidents_table, VALID_INCIDENT_STATES
+from _utils import (
+    INCIDENTS_TABLE,
+    incidents_table,
+    VALID_INCIDENT_STATES,
+    INCIDENTS_STATE_INDEX,
+    INCIDENTS_UPDATED_INDEX,
+    build_tenant_state,
+    get_version_stamp,
+    list_page,
+    parse_list_page,
+    resolve_fields,
+    search_page,
+)
+from _response import etag, etag_matches, if_none_match, json_response, not_modified
+from _search import is_indexable, search as search_index
 from hasPermission import has_permission
 
 
 def lambda_handler(event, context):
     code = has_permission(event, context)
     if code != 200:
-        return {
-            "statusCode": code,
-            "headers": CORS_HEADERS,
-            "body": json.dumps({"message": "forbidden"}),
-        }
+        return json_response(code, {"message": "forbidden"})
 
     body = event.get("body")
     if isinstance(body, str):
@@ -23,98 +32,105 @@ def lambda_handler(event, context):
 
     tenant = body.get("tenant")
     if not tenant:
-        return {
-            "statusCode": 400,
-            "body": json.dumps({"message": "tenant query param required"}),
-            "headers": CORS_HEADERS,
-        }
+        return json_response(400, {"message": "tenant query param required"})
 
-    filter_expr = Attr("tenant").eq(tenant)
+    normalized = []
     states = body.get("states")
     state = body.get("state")
     if states:
-        normalized = []
         for item in states:
             if not item:
                 continue
             upper = str(item).upper()
             if upper not in VALID_INCIDENT_STATES:
-                return {
-                    "statusCode": 400,
-                    "body": json.dumps(
-                        {
-                            "message": f"states values must be within {sorted(VALID_INCIDENT_STATES)}"
-                        }
-                    ),
-                    "headers": CORS_HEADERS,
-                }
-            normalized.append(upper)
-        if normalized:
-            filter_expr = filter_expr & Attr("state").is_in(normalized)
+                return json_response(
+                    400,
+                    {
+                        "message": f"states values must be within {sorted(VALID_INCIDENT_STATES)}"
+                    },
+                )
+            if upper not in normalized:
+                normalized.append(upper)
     elif state:
         state_upper = state.upper()
         if state_upper not in VALID_INCIDENT_STATES:
-            return {
-                "statusCode": 400,
-                "body": json.dumps(
-                    {"message": f"state must be one of {sorted(VALID_INCIDENT_STATES)}"}
-                ),
-                "headers": CORS_HEADERS,
-            }
-        filter_expr = filter_expr & Attr("state").eq(state_upper)
+            return json_response(
+                400,
+                {"message": f"state must be one of {sorted(VALID_INCIDENT_STATES)}"},
+            )
+        normalized.append(state_upper)
+
+    filters = []
+    if len(normalized) == 1:
+        # single state: read only that tenant#state partition of the state index
+        query_kwargs = {
+            "IndexName": INCIDENTS_STATE_INDEX,
+            "KeyConditionExpression": Key("tenantState").eq(
+                build_tenant_state(tenant, normalized[0])
+            ),
+        }
+        key_names = ("tenant", "id", "tenantState", "updatedAt")
+    else:
+        query_kwargs = {
+            "IndexName": INCIDENTS_UPDATED_INDEX,
+            "KeyConditionExpression": Key("tenant").eq(tenant),
+        }
+        key_names = ("tenant", "id", "updatedAt")
+        if normalized and len(normalized) < len(VALID_INCIDENT_STATES):
+            filters.append(Attr("state").is_in(normalized))
+
+    order = (body.get("order") or "desc").lower()
+    if order not in ("asc", "desc"):
+        return json_response(400, {"message": "order must be one of ['asc', 'desc']"})
+    query_kwargs["ScanIndexForward"] = order == "asc"
 
     creator = body.get("creator")
     if creator:
-        filter_expr = filter_expr & Attr("creator").eq(creator)
+        filters.append(Attr("creator").eq(creator))
 
     search = (body.get("search") or "").strip().lower()
-    if search:
-        filter_expr = filter_expr & Attr("searchKey").contains(search)
+    use_index = bool(search) and is_indexable(search)
+    if search and not use_index:
+        # words shorter than a trigram: substring filter over the partition
+        filters.append(Attr("searchKey").contains(search))
 
-    default_limit = 50
-    max_limit = 100
-    limit_raw = body.get("pageSize") or body.get("limit")
-    try:
-        limit = int(limit_raw) if limit_raw is not None else default_limit
-    except (TypeError, ValueError):
-        return {
-            "statusCode": 400,
-            "body": json.dumps({"message": "pageSize/limit must be a number"}),
-            "headers": CORS_HEADERS,
-        }
-    if limit <= 0:
-        limit = default_limit
-    limit = min(limit, max_limit)
+    page, error = parse_list_page(body)
+    if error:
+        return json_response(400, {"message": error})
 
-    last_key: Dict[str, Any] | None = body.get("lastEvaluatedKey") or body.get(
-        "lastKey"
-    )
-    if last_key is not None and not isinstance(last_key, dict):
-        return {
-            "statusCode": 400,
-            "body": json.dumps({"message": "lastEvaluatedKey must be an object"}),
-            "headers": CORS_HEADERS,
-        }
+    fields, error = resolve_fields("incident", body.get("fields"), "summary")
+    if error:
+        return json_response(400, {"message": error})
 
     try:
-        scan_kwargs = {"FilterExpression": filter_expr, "Limit": limit}
-        if last_key:
-            scan_kwargs["ExclusiveStartKey"] = last_key
+        # see get_version_stamp
+        stamp = get_version_stamp("incident", tenant)
+        tag = etag("incident-list", tenant, stamp, body) if stamp is not None else None
+        if tag and etag_matches(if_none_match(event), tag):
+            return not_modified(tag)
+        headers = {"ETag": tag} if tag else None
 
-        resp = incidents_table.scan(**scan_kwargs)
-        items = resp.get("Items", [])
-        response_body = {
-            "items": items,
-            "lastEvaluatedKey": resp.get("LastEvaluatedKey"),
-        }
-        return {
-            "statusCode": 200,
-            "body": json.dumps(response_body),
-            "headers": CORS_HEADERS,
-        }
+        if use_index:
+            response_body = search_page(
+                lambda offset, limit: search_index(
+                    INCIDENTS_TABLE,
+                    tenant,
+                    "incident",
+                    search,
+                    offset,
+                    limit,
+                    predicate=lambda item: (
+                        not normalized or item.get("state") in normalized
+                    )
+                    and (not creator or item.get("creator") == creator),
+                ),
+                page,
+                fields,
+            )
+        else:
+            response_body = list_page(
+                incidents_table.query, query_kwargs, filters, page, key_names, fields
+            )
+        return json_response(200, response_body, headers)
     except Exception as e:
-        return {
-            "statusCode": 500,
-            "body": json.dumps({"message": "internal error", "error": str(e)}),
-            "headers": CORS_HEADERS,
-        }
+        return json_response(500, {"message": "internal error", "error": str(e)})
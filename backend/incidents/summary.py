@@ -0,0 +1,28 @@
+# incident/summary.py
+import json
+
+from _utils import summary_table
+from _response import json_response
+from _summary import empty_summary, public_summary
+from hasPermission import has_permission
+
+
+def lambda_handler(event, context):
+    """Dashboard counters: one read of the tenant's stream-maintained summary."""
+    code = has_permission(event, context)
+    if code != 200:
+        return json_response(code, {"message": "forbidden"})
+
+    body = event.get("body")
+    if isinstance(body, str):
+        body = json.loads(body)
+
+    tenant = body.get("tenant")
+    if not tenant:
+        return json_response(400, {"message": "tenant required"})
+
+    try:
+        summary = summary_table.get_item(Key={"tenant": tenant}).get("Item")
+        return json_response(200, public_summary(summary or empty_summary(tenant)))
+    except Exception as e:
+        return json_response(500, {"message": "internal error", "error": str(e)})
@@ -0,0 +1,43 @@
+# incident/summary_stream.py
+from boto3.dynamodb.types import TypeDeserializer
+
+from _summary import apply_changes
+
+deserializer = TypeDeserializer()
+
+
+def _image(image):
+    if not image:
+        return None
+    return {k: deserializer.deserialize(v) for k, v in image.items()}
+
+
+def lambda_handler(event, context):
+    """
+    IncidentsTable stream consumer: folds INSERT / MODIFY / REMOVE records
+    into the per-tenant summaries, one conditional write per tenant and
+    batch. A tenant that fails reports its records (ReportBatchItemFailures)
+    so only they are retried.
+    """
+    changes_by_tenant = {}
+    records_by_tenant = {}
+    for record in event.get("Records", []):
+        ddb = record.get("dynamodb", {})
+        old = _image(ddb.get("OldImage"))
+        new = _image(ddb.get("NewImage"))
+        keys = _image(ddb.get("Keys")) or {}
+        tenant = keys.get("tenant")
+        if not tenant:
+            continue
+        changes_by_tenant.setdefault(tenant, []).append((record["eventID"], old, new))
+        records_by_tenant.setdefault(tenant, []).append(ddb.get("SequenceNumber"))
+
+    failures = []
+    for tenant, changes in changes_by_tenant.items():
+        try:
+            apply_changes(tenant, changes)
+        except Exception as e:
+            print("summary update failed", tenant, e)
+            failures.extend(records_by_tenant[tenant])
+
+    return {"batchItemFailures": [{"itemIdentifier": seq} for seq in failures if seq]}
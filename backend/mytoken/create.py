@@ -7,8 +7,9 @@ from _utils import (
     tokens_table,
     verify_password,
     epoch_seconds_in,
-    CORS_HEADERS,
 )
+from _response import json_response
+from _tokens import signed_tokens_enabled, issue_signed_token
 
 DEFAULT_TTL_SECONDS = int(
     os.environ.get("TOKEN_TTL_SECONDS", 60 * 60 * 24 * 7)
@@ -25,11 +26,7 @@ def lambda_handler(event, context):
     ttl = body.get("ttlSeconds", DEFAULT_TTL_SECONDS)
 
     if not tenant or not email or not password:
-        return {
-            "statusCode": 400,
-            "body": json.dumps({"message": "tenant, email and password required"}),
-            "headers": CORS_HEADERS,
-        }
+        return json_response(400, {"message": "tenant, email and password required"})
 
     # Retrieve user by id (we store id==email)
     # If you had tenant+email composite key you'd query; here we will get by PK email and check tenant.
@@ -37,34 +34,30 @@ def lambda_handler(event, context):
         resp = users_table.get_item(Key={"tenant": tenant, "id": email})
         user = resp["Item"]
         if "passwordHash" not in user or "salt" not in user:
-            return {
-                "statusCode": 401,
-                "body": json.dumps({"message": "invalid credentials"}),
-                "headers": CORS_HEADERS,
-            }
+            return json_response(401, {"message": "invalid credentials"})
 
         if not verify_password(password, user["passwordHash"], user["salt"]):
-            return {
-                "statusCode": 401,
-                "body": json.dumps({"message": "invalid credentials"}),
-                "headers": CORS_HEADERS,
-            }
+            return json_response(401, {"message": "invalid credentials"})
 
-        token_value = uuid.uuid4()  # opaque token given to client
-        token_id = f"{tenant}#{token_value.hex}"
-        token_value = token_value.hex
         expires_epoch = epoch_seconds_in(ttl)
+        if signed_tokens_enabled():
+            # verified locally by has_permission, nothing to store
+            token_id, token_value = issue_signed_token(tenant, user, expires_epoch)
+        else:
+            token_value = uuid.uuid4()  # opaque token given to client
+            token_id = f"{tenant}#{token_value.hex}"
+            token_value = token_value.hex
 
-        token_item = {
-            "id": token_id,
-            "token": token_value,
-            "tenant": tenant,
-            "userId": user["id"],
-            "user": user,
-            "expiresAt": expires_epoch,  # use as TTL attribute
-        }
+            token_item = {
+                "id": token_id,
+                "token": token_value,
+                "tenant": tenant,
+                "userId": user["id"],
+                "user": user,
+                "expiresAt": expires_epoch,  # use as TTL attribute
+            }
 
-        tokens_table.put_item(Item=token_item)
+            tokens_table.put_item(Item=token_item)
 
         result = {
             "tenant": tenant,
@@ -75,14 +68,6 @@ def lambda_handler(event, context):
                 k: v for k, v in user.items() if k != "passwordHash" and k != "salt"
             },
         }
-        return {
-            "statusCode": 200,
-            "body": json.dumps(result),
-            "headers": CORS_HEADERS,
-        }
+        return json_response(200, result)
     except Exception as e:
-        return {
-            "statusCode": 500,
-            "body": json.dumps({"message": "internal error", "error": str(e)}),
-            "headers": CORS_HEADERS,
-        }
+        return json_response(500, {"message": "internal error", "error": str(e)})
@@ -1,18 +1,16 @@
 # token/delete.py
 import json
 import os
-from _utils import tokens_table, split_token, CORS_HEADERS
-from hasPermission import has_permission
+from _utils import tokens_table, split_token
+from _response import json_response
+from _tokens import is_signed_token, revoke_signed_token
+from hasPermission import has_permission, invalidate_token
 
 
 def lambda_handler(event, context):
     code = has_permission(event, context)
     if code != 200:
-        return {
-            "statusCode": code,
-            "headers": CORS_HEADERS,
-            "body": json.dumps({"message": "forbidden"}),
-        }
+        return json_response(code, {"message": "forbidden"})
 
     print(event)
     body = event.get("body")
@@ -20,23 +18,18 @@ def lambda_handler(event, context):
         body = json.loads(body)
     token = body.get("token")
     if not token:
-        return {
-            "statusCode": 400,
-            "body": json.dumps({"message": "token required"}),
-            "headers": CORS_HEADERS,
-        }
-    tenant, _ = split_token(token)
+        return json_response(400, {"message": "token required"})
+    parts = split_token(token)
+    if parts is None:
+        return json_response(400, {"message": "invalid token"})
+    tenant, _ = parts
 
     try:
-        tokens_table.delete_item(Key={"tenant": tenant, "id": token})
-        return {
-            "statusCode": 200,
-            "body": json.dumps({"message": "logged out"}),
-            "headers": CORS_HEADERS,
-        }
+        if is_signed_token(token):
+            revoke_signed_token(token)
+        else:
+            tokens_table.delete_item(Key={"tenant": tenant, "id": token})
+            invalidate_token(token)
+        return json_response(200, {"message": "logged out"})
     except Exception as e:
-        return {
-            "statusCode": 500,
-            "body": json.dumps({"message": "internal error", "error": str(e)}),
-            "headers": CORS_HEADERS,
-        }
+        return json_response(500, {"message": "internal error", "error": str(e)})
@@ -0,0 +1,47 @@
+# router.py
+import importlib
+from typing import Callable, Dict
+
+from _response import json_response
+from hasPermission import ARN_ACTION
+
+# Single-entry mode: one function behind "ANY /{proxy+}" serves every route, so
+# a warm container answers all of them instead of each route cold-starting on
+# its own. Routes are the METHOD/path keys of hasPermission.ARN_ACTION (plus the
+# unauthenticated login route), so a route added there is dispatched here too;
+# the handler module is <package of the resource>.<last path segment>, e.g.
+# "PUT/incident/batch-update" -> incidents.batch_update. Handler modules are
+# imported on first use.
+RESOURCE_PACKAGES = {"users": "user", "incidents": "incidents", "tokens": "mytoken"}
+
+
+def _module_name(arn_key: str, resource: str) -> str:
+    return f"{RESOURCE_PACKAGES[resource]}.{arn_key.rsplit('/', 1)[1].replace('-', '_')}"
+
+
+ROUTES = {
+    "POST/auth/token/create": "mytoken.create",
+    **{
+        arn_key: _module_name(arn_key, resource)
+        for arn_key, (resource, _) in ARN_ACTION.items()
+    },
+}
+
+_handlers: Dict[str, Callable] = {}
+
+
+def _load(module_name: str) -> Callable:
+    handler = _handlers.get(module_name)
+    if handler is None:
+        handler = importlib.import_module(module_name).lambda_handler
+        _handlers[module_name] = handler
+    return handler
+
+
+def lambda_handler(event, context):
+    method = (event.get("httpMethod") or "").upper()
+    path = (event.get("path") or "").strip("/")
+    module_name = ROUTES.get(f"{method}/{path}")
+    if not module_name:
+        return json_response(404, {"message": "route not found"})
+    return _load(module_name)(event, context)
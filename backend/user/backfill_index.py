@@ -0,0 +1,23 @@
+# user/backfill_index.py
+import json
+
+from _utils import users_table, run_backfill
+from _search import reindex
+
+
+def lambda_handler(event, context):
+    """
+    Migration and repair: writes search postings for users.
+    {"tenant"?, "exclusiveStartKey"?}; when the response has an
+    exclusiveStartKey, invoke again with it to continue.
+    """
+    counts = {"indexed": 0}
+
+    def process(items):
+        counts["indexed"] += reindex("user", items)
+
+    last_key = run_backfill(users_table, event, context, process)
+    return {
+        "statusCode": 200,
+        "body": json.dumps(dict(counts, exclusiveStartKey=last_key)),
+    }
@@ -5,21 +5,21 @@ from _utils import (
     users_table,
     hash_password,
     now_iso,
-    CORS_HEADERS,
     VALID_USER_STATUSES,
     build_user_search_key,
+    bump_version_stamp,
+    select_fields,
+    RESPONSE_FIELDS,
 )
+from _response import json_response
+from _search import index_document
 from hasPermission import has_permission
 
 
 def lambda_handler(event, context):
     code = has_permission(event, context)
     if code != 200:
-        return {
-            "statusCode": code,
-            "headers": CORS_HEADERS,
-            "body": json.dumps({"message": "forbidden"}),
-        }
+        return json_response(code, {"message": "forbidden"})
 
     body = event.get("body")
     if isinstance(body, str):
@@ -33,20 +33,12 @@ def lambda_handler(event, context):
     notes = body.get("notes", "")
     status = (body.get("status") or "ACTIVE").upper()
     if status not in VALID_USER_STATUSES:
-        return {
-            "statusCode": 400,
-            "body": json.dumps(
-                {"message": f"status must be one of {sorted(VALID_USER_STATUSES)}"}
-            ),
-            "headers": CORS_HEADERS,
-        }
+        return json_response(
+            400, {"message": f"status must be one of {sorted(VALID_USER_STATUSES)}"}
+        )
 
     if not tenant or not email or not password:
-        return {
-            "statusCode": 400,
-            "body": json.dumps({"message": "tenant, email and password required"}),
-            "headers": CORS_HEADERS,
-        }
+        return json_response(400, {"message": "tenant, email and password required"})
 
     user_id = email  # as in your TS, id is duplicate of email
     password_hash, salt = hash_password(password)
@@ -65,6 +57,7 @@ def lambda_handler(event, context):
         "status": status,
         "createdAt": now,
         "updatedAt": now,
+        "version": 1,
         "searchKey": build_user_search_key(full_name, email, roles, status),
     }
 
@@ -72,15 +65,10 @@ def lambda_handler(event, context):
         users_table.put_item(
             Item=user_item, ConditionExpression="attribute_not_exists(id)"
         )
-        # don't include passwordHash/salt in response
-        return {
-            "statusCode": 201,
-            "body": json.dumps(user_item),
-            "headers": CORS_HEADERS,
-        }
+        index_document(tenant, "user", user_id, None, user_item["searchKey"])
+        bump_version_stamp("user", tenant)
+        return json_response(
+            201, select_fields(user_item, RESPONSE_FIELDS["user"]["full"])
+        )
     except Exception as e:
-        return {
-            "statusCode": 400,
-            "body": json.dumps({"message": "could not create user", "error": str(e)}),
-            "headers": CORS_HEADERS,
-        }
+        return json_response(400, {"message": "could not create user", "error": str(e)})
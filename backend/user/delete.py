@@ -1,17 +1,15 @@
 # user/delete.py
 import json
-from _utils import users_table, CORS_HEADERS
+from _utils import users_table, bump_version_stamp
+from _response import json_response
+from _search import index_document
 from hasPermission import has_permission
 
 
 def lambda_handler(event, context):
     code = has_permission(event, context)
     if code != 200:
-        return {
-            "statusCode": code,
-            "headers": CORS_HEADERS,
-            "body": json.dumps({"message": "forbidden"}),
-        }
+        return json_response(code, {"message": "forbidden"})
 
     body = event.get("body")
     if isinstance(body, str):
@@ -19,27 +17,17 @@ def lambda_handler(event, context):
     tenant = body.get("tenant")
     user_id = body.get("id")
     if not tenant:
-        return {
-            "statusCode": 400,
-            "body": json.dumps({"message": "tenant required"}),
-            "headers": CORS_HEADERS,
-        }
+        return json_response(400, {"message": "tenant required"})
     if not user_id:
-        return {
-            "statusCode": 400,
-            "body": json.dumps({"message": "id required"}),
-            "headers": CORS_HEADERS,
-        }
+        return json_response(400, {"message": "id required"})
     try:
-        users_table.delete_item(Key={"tenant": tenant, "id": user_id})
-        return {
-            "statusCode": 200,
-            "body": json.dumps({"message": "deleted"}),
-            "headers": CORS_HEADERS,
-        }
+        resp = users_table.delete_item(
+            Key={"tenant": tenant, "id": user_id}, ReturnValues="ALL_OLD"
+        )
+        previous = resp.get("Attributes")
+        if previous:
+            index_document(tenant, "user", user_id, previous.get("searchKey"), None)
+            bump_version_stamp("user", tenant)
+        return json_response(200, {"message": "deleted"})
     except Exception as e:
-        return {
-            "statusCode": 500,
-            "body": json.dumps({"message": "internal error", "error": str(e)}),
-            "headers": CORS_HEADERS,
-        }
+        return json_response(500, {"message": "internal error", "error": str(e)})
@@ -1,32 +1,33 @@
 # user/list.py
 import json
-from typing import Any, Dict
 
-from boto3.dynamodb.conditions import Attr
+from boto3.dynamodb.conditions import Attr, Key
 
-from _utils import CORS_HEADERS, users_table
+from _utils import (
+    USERS_TABLE,
+    users_table,
+    get_version_stamp,
+    list_page,
+    parse_list_page,
+    resolve_fields,
+    search_page,
+)
+from _response import etag, etag_matches, if_none_match, json_response, not_modified
+from _search import is_indexable, search as search_index
 from hasPermission import has_permission
 
 
 def lambda_handler(event, context):
     code = has_permission(event, context)
     if code != 200:
-        return {
-            "statusCode": code,
-            "headers": CORS_HEADERS,
-            "body": json.dumps({"message": "forbidden"}),
-        }
+        return json_response(code, {"message": "forbidden"})
 
     body = event.get("body")
     if isinstance(body, str):
         body = json.loads(body)
     tenant = body["tenant"]
     if not tenant:
-        return {
-            "statusCode": 400,
-            "body": json.dumps({"message": "tenant query param required"}),
-            "headers": CORS_HEADERS,
-        }
+        return json_response(400, {"message": "tenant query param required"})
 
     search = (body.get("search") or "").strip().lower()
     role_filter = body.get("role")
@@ -34,58 +35,63 @@ def lambda_handler(event, context):
     if status_filter:
         status_filter = status_filter.upper()
 
-    default_limit = 50
-    max_limit = 100
-    limit_raw = body.get("pageSize") or body.get("limit")
-    try:
-        limit = int(limit_raw) if limit_raw is not None else default_limit
-    except (TypeError, ValueError):
-        return {
-            "statusCode": 400,
-            "body": json.dumps({"message": "pageSize/limit must be a number"}),
-            "headers": CORS_HEADERS,
-        }
-    if limit <= 0:
-        limit = default_limit
-    limit = min(limit, max_limit)
+    page, error = parse_list_page(body)
+    if error:
+        return json_response(400, {"message": error})
+
+    fields, error = resolve_fields("user", body.get("fields"), "summary")
+    if error:
+        return json_response(400, {"message": error})
 
-    last_key: Dict[str, Any] | None = body.get("lastEvaluatedKey") or body.get(
-        "lastKey"
-    )
-    if last_key is not None and not isinstance(last_key, dict):
-        return {
-            "statusCode": 400,
-            "body": json.dumps({"message": "lastEvaluatedKey must be an object"}),
-            "headers": CORS_HEADERS,
-        }
     try:
-        filter_expr = Attr("tenant").eq(tenant)
+        # see get_version_stamp
+        stamp = get_version_stamp("user", tenant)
+        tag = etag("user-list", tenant, stamp, body) if stamp is not None else None
+        if tag and etag_matches(if_none_match(event), tag):
+            return not_modified(tag)
+        headers = {"ETag": tag} if tag else None
+
+        if search and is_indexable(search):
+            response_body = search_page(
+                lambda offset, limit: search_index(
+                    USERS_TABLE,
+                    tenant,
+                    "user",
+                    search,
+                    offset,
+                    limit,
+                    predicate=lambda item: (
+                        not role_filter
+                        or role_filter == "all"
+                        or role_filter in (item.get("roles") or [])
+                    )
+                    and (
+                        not status_filter
+                        or status_filter == "ALL"
+                        or item.get("status") == status_filter
+                    ),
+                ),
+                page,
+                fields,
+            )
+            return json_response(200, response_body, headers)
+
+        filters = []
         if role_filter and role_filter != "all":
-            filter_expr = filter_expr & Attr("roles").contains(role_filter)
+            filters.append(Attr("roles").contains(role_filter))
         if status_filter and status_filter != "ALL":
-            filter_expr = filter_expr & Attr("status").eq(status_filter)
+            filters.append(Attr("status").eq(status_filter))
         if search:
-            filter_expr = filter_expr & Attr("searchKey").contains(search)
-
-        scan_kwargs = {"FilterExpression": filter_expr, "Limit": limit}
-        if last_key:
-            scan_kwargs["ExclusiveStartKey"] = last_key
-
-        resp = users_table.scan(**scan_kwargs)
-        items = resp.get("Items", [])
-
-        response_body = {
-            "items": items,
-            "lastEvaluatedKey": resp.get("LastEvaluatedKey"),
-        }
-        return {
-            "statusCode": 200,
-            "body": json.dumps(response_body),
-            "headers": CORS_HEADERS,
-        }
+            # words shorter than a trigram: substring filter over the partition
+            filters.append(Attr("searchKey").contains(search))
+        response_body = list_page(
+            users_table.query,
+            {"KeyConditionExpression": Key("tenant").eq(tenant)},
+            filters,
+            page,
+            ("tenant", "id"),
+            fields,
+        )
+        return json_response(200, response_body, headers)
     except Exception as e:
-        return {
-            "statusCode": 500,
-            "body": json.dumps({"message": "internal error", "error": str(e)}),
-            "headers": CORS_HEADERS,
-        }
+        return json_response(500, {"message": "internal error", "error": str(e)})
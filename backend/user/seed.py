@@ -3,7 +3,7 @@ import json
 import os
 import secrets
 import string
-from _utils import users_table, hash_password, now_iso
+from _utils import users_table, hash_password, now_iso, bump_version_stamp
 
 
 def random_string(length=10):
@@ -52,12 +52,14 @@ def lambda_handler(event, context):
         "roles": ["user", "admin"],
         "createdAt": now,
         "updatedAt": now,
+        "version": 1,
     }
 
     try:
         users_table.put_item(
             Item=user_item, ConditionExpression="attribute_not_exists(id)"
         )
+        bump_version_stamp("user", tenant)
 
         # return the credentials so the tenant admin can log in
         return {
@@ -1,24 +1,25 @@
 # user/update.py
 import json
+from botocore.exceptions import ClientError
 from _utils import (
     users_table,
     hash_password,
     now_iso,
-    CORS_HEADERS,
     VALID_USER_STATUSES,
     build_user_search_key,
+    bump_version_stamp,
+    select_fields,
+    RESPONSE_FIELDS,
 )
+from _response import json_response
+from _search import sync_search_key
 from hasPermission import has_permission
 
 
 def lambda_handler(event, context):
     code = has_permission(event, context)
     if code != 200:
-        return {
-            "statusCode": code,
-            "headers": CORS_HEADERS,
-            "body": json.dumps({"message": "forbidden"}),
-        }
+        return json_response(code, {"message": "forbidden"})
 
     body = event.get("body")
     if isinstance(body, str):
@@ -26,26 +27,9 @@ def lambda_handler(event, context):
     tenant = body.get("tenant")
     user_id = body.get("id")
     if not tenant:
-        return {
-            "statusCode": 400,
-            "body": json.dumps({"message": "tenant required"}),
-            "headers": CORS_HEADERS,
-        }
+        return json_response(400, {"message": "tenant required"})
     if not user_id:
-        return {
-            "statusCode": 400,
-            "body": json.dumps({"message": "id required"}),
-            "headers": CORS_HEADERS,
-        }
-
-    current_resp = users_table.get_item(Key={"tenant": tenant, "id": user_id})
-    current = current_resp.get("Item")
-    if not current:
-        return {
-            "statusCode": 404,
-            "body": json.dumps({"message": "user not found"}),
-            "headers": CORS_HEADERS,
-        }
+        return json_response(400, {"message": "id required"})
 
     update_expr = []
     expr_attr_vals = {}
@@ -73,60 +57,55 @@ def lambda_handler(event, context):
         update_expr.append("#notes = :notes")
         expr_attr_vals[":notes"] = body["notes"]
         expr_attr_names["#notes"] = "notes"
-    status = None
     if "status" in body:
         status = (body["status"] or "").upper()
         if status not in VALID_USER_STATUSES:
-            return {
-                "statusCode": 400,
-                "body": json.dumps(
-                    {"message": f"status must be one of {sorted(VALID_USER_STATUSES)}"}
-                ),
-                "headers": CORS_HEADERS,
-            }
-        update_expr.append("status = :status")
+            return json_response(
+                400, {"message": f"status must be one of {sorted(VALID_USER_STATUSES)}"}
+            )
+        update_expr.append("#status = :status")
         expr_attr_vals[":status"] = status
-    else:
-        status = current.get("status", "ACTIVE")
+        expr_attr_names["#status"] = "status"
 
     update_expr.append("updatedAt = :u")
     expr_attr_vals[":u"] = now_iso()
 
     if not update_expr:
-        return {
-            "statusCode": 400,
-            "body": json.dumps({"message": "no updatable fields provided"}),
-            "headers": CORS_HEADERS,
-        }
+        return json_response(400, {"message": "no updatable fields provided"})
 
-    resulting_full_name = (
-        body["fullName"] if "fullName" in body else current.get("fullName", "")
-    )
-    resulting_roles = body["roles"] if "roles" in body else current.get("roles", [])
-    resulting_status = status or current.get("status", "ACTIVE")
-    expr_attr_vals[":searchKey"] = build_user_search_key(
-        resulting_full_name, current["email"], resulting_roles, resulting_status
-    )
-    update_expr.append("searchKey = :searchKey")
-
-    update_expression = "SET " + ", ".join(update_expr)
+    expr_attr_names["#ver"] = "version"
+    expr_attr_vals[":one"] = 1
+    update_expression = "SET " + ", ".join(update_expr) + " ADD #ver :one"
     try:
-        users_table.update_item(
-            Key={"tenant": tenant, "id": user_id},
-            UpdateExpression=update_expression,
-            ExpressionAttributeValues=expr_attr_vals,
-            ExpressionAttributeNames=expr_attr_names if expr_attr_names else None,
-        )
-        resp = users_table.get_item(Key={"tenant": tenant, "id": user_id})
-        item = resp.get("Item")
-        return {
-            "statusCode": 200,
-            "body": json.dumps(item),
-            "headers": CORS_HEADERS,
+        # conditional on attribute_exists, as in incidents/update.py
+        update_kwargs = {
+            "Key": {"tenant": tenant, "id": user_id},
+            "UpdateExpression": update_expression,
+            "ConditionExpression": "attribute_exists(id)",
+            "ExpressionAttributeValues": expr_attr_vals,
+            "ReturnValues": "ALL_NEW",
         }
+        if expr_attr_names:
+            update_kwargs["ExpressionAttributeNames"] = expr_attr_names
+        try:
+            item = users_table.update_item(**update_kwargs)["Attributes"]
+        except ClientError as e:
+            if e.response["Error"]["Code"] != "ConditionalCheckFailedException":
+                raise
+            return json_response(404, {"message": "user not found"})
+
+        item = sync_search_key(
+            users_table,
+            "user",
+            item,
+            build_user_search_key(
+                item.get("fullName", ""),
+                item["email"],
+                item.get("roles", []),
+                item.get("status", "ACTIVE"),
+            ),
+        )
+        bump_version_stamp("user", tenant)
+        return json_response(200, select_fields(item, RESPONSE_FIELDS["user"]["full"]))
     except Exception as e:
-        return {
-            "statusCode": 500,
-            "body": json.dumps({"message": "internal error", "error": str(e)}),
-            "headers": CORS_HEADERS,
-        }
+        return json_response(500, {"message": "internal error", "error": str(e)})
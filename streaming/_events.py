@@ -0,0 +1,71 @@
+import os
+import json
+import base64
+from decimal import Decimal
+from boto3.dynamodb.types import Binary
+
+# Shared by notify (live fan-out) and resume (replay from the event log).
+
+# API Gateway rejects WebSocket messages above 128 KB
+MAX_MESSAGE_BYTES = int(os.environ.get("MAX_MESSAGE_BYTES", 120 * 1024))
+
+# subscription filter -> item attribute, most selective first; each
+# subscription is indexed under the first of these it sets
+FILTER_FIELDS = (("incidentId", "id"), ("creator", "creator"), ("state", "state"))
+
+def json_default(value):
+    # deserialized stream images carry Decimal numbers, sets and Binary;
+    # numbers must stay numbers for clients, as in the REST responses
+    if isinstance(value, Decimal):
+        return int(value) if value == value.to_integral_value() else float(value)
+    if isinstance(value, (set, frozenset)):
+        return sorted(value, key=str)
+    if isinstance(value, Binary):
+        value = value.value
+    if isinstance(value, (bytes, bytearray)):
+        return base64.b64encode(bytes(value)).decode("ascii")
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+def log_sort_key(sequence_number):
+    # stream sequence numbers are decimal strings of varying length; padding
+    # makes their string order match their numeric order
+    return str(sequence_number).zfill(40)
+
+def match_values(*images):
+    """Filterable values of a change, taken from its old and new images."""
+    values = {}
+    for _, attribute in FILTER_FIELDS:
+        found = sorted(
+            {str(image[attribute]) for image in images if image and image.get(attribute) is not None}
+        )
+        if found:
+            values[attribute] = found
+    return values
+
+def matches(filters, values):
+    # every filter field must match the old or the new image, so a client
+    # watching PENDING also sees the incident that just left PENDING
+    for name, attribute in FILTER_FIELDS:
+        wanted = filters.get(name)
+        if wanted and not set(wanted) & set(values.get(attribute, ())):
+            return False
+    return True
+
+def encode_frames(encoded_events, frame_type="batch", **extra):
+    """One message with every event, split only when it would pass MAX_MESSAGE_BYTES."""
+    chunks = []
+    current = []
+    size = 0
+    for encoded in encoded_events:
+        if current and size + len(encoded) + 1 > MAX_MESSAGE_BYTES:
+            chunks.append(current)
+            current, size = [], 0
+        current.append(encoded)
+        size += len(encoded) + 1
+    if current:
+        chunks.append(current)
+    head = json.dumps(dict(extra, type=frame_type))[:-1]
+    return [
+        (head + ',"events":[' + ",".join(chunk) + "]}").encode("utf-8")
+        for chunk in chunks
+    ]
@@ -0,0 +1,34 @@
+import os
+import json
+import time
+import boto3
+from botocore.exceptions import ClientError
+
+dynamodb = boto3.resource("dynamodb")
+ws_table = dynamodb.Table(os.environ["WEBSOCKETS_TABLE"])
+CONNECTION_TTL_SECONDS = int(os.environ.get("CONNECTION_TTL_SECONDS", 15 * 60))
+
+def _response(status_code, body):
+    return {"statusCode": status_code, "body": json.dumps(body)}
+
+def handler(event, context):
+    """
+    {"action": "heartbeat"}
+    Pushes the connection's expiresAt forward. Clients send it more often than
+    CONNECTION_TTL_SECONDS (and than API Gateway's 10 minute idle timeout).
+    """
+    connection_id = event["requestContext"]["connectionId"]
+    expires_at = int(time.time()) + CONNECTION_TTL_SECONDS
+    try:
+        ws_table.update_item(
+            Key={"connectionId": connection_id},
+            UpdateExpression="SET expiresAt = :e",
+            ConditionExpression="attribute_exists(connectionId)",
+            ExpressionAttributeValues={":e": expires_at},
+        )
+    except ClientError as e:
+        if e.response["Error"]["Code"] != "ConditionalCheckFailedException":
+            raise
+        return _response(404, {"message": "connection not found"})
+
+    return _response(200, {"expiresAt": expires_at})
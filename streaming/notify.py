@@ -1,15 +1,51 @@
 import os
 import json
+import random
+import time
+from concurrent.futures import ThreadPoolExecutor
 import boto3
+from botocore.config import Config
+from boto3.dynamodb.conditions import Attr, Key
 from boto3.dynamodb.types import TypeDeserializer
+from _events import (
+    FILTER_FIELDS,
+    encode_frames,
+    json_default,
+    log_sort_key,
+    match_values,
+    matches,
+)
+
+# posts run on a bounded thread pool sharing one client and its connection pool
+FANOUT_CONCURRENCY = int(os.environ.get("FANOUT_CONCURRENCY", 32))
 
 client = boto3.client(
     "apigatewaymanagementapi",
     endpoint_url=os.environ["API_GATEWAY_ENDPOINT"],
+    config=Config(
+        max_pool_connections=FANOUT_CONCURRENCY,
+        retries={"mode": "standard", "max_attempts": 3},
+        tcp_keepalive=True,
+        connect_timeout=2,
+        read_timeout=5,
+    ),
 )
+executor = ThreadPoolExecutor(max_workers=FANOUT_CONCURRENCY)
+# events bigger than this are replaced by a refetch hint
+MAX_EVENT_BYTES = int(os.environ.get("MAX_EVENT_BYTES", 4 * 1024))
+# never sent to clients: derived index attributes and credentials
+INTERNAL_FIELDS = {"searchKey", "tenantState", "passwordHash", "salt"}
 
 dynamodb = boto3.resource("dynamodb")
 ws_table = dynamodb.Table(os.environ["WEBSOCKETS_TABLE"])
+CONNECTIONS_TENANT_INDEX = os.environ.get("CONNECTIONS_TENANT_INDEX", "tenantId-index")
+event_log_table = dynamodb.Table(os.environ["EVENT_LOG_TABLE"])
+EVENT_LOG_TTL_SECONDS = int(os.environ.get("EVENT_LOG_TTL_SECONDS", 24 * 60 * 60))
+# stream attempts an event gets while some of its connections keep failing;
+# after that it is logged with those connections as `undelivered` (they catch
+# up through resume) so one bad connection can't hold the shard back
+NOTIFY_MAX_DELIVERY_ATTEMPTS = int(os.environ.get("NOTIFY_MAX_DELIVERY_ATTEMPTS", 3))
+CHECKPOINT_READ_MAX_ATTEMPTS = 6
 
 deserializer = TypeDeserializer()
 
@@ -45,10 +81,341 @@ def _guess_entity_type(table_name):
 
     return None
 
+def _tenant_connections(tenant):
+    # connections registered with ?tenantId=<tenant> on $connect
+    connections = []
+    kwargs = {
+        "IndexName": CONNECTIONS_TENANT_INDEX,
+        "KeyConditionExpression": Key("tenantId").eq(tenant),
+        # expired rows linger until TTL deletes them; their clients stopped
+        # sending heartbeats, so don't spend posts on them
+        "FilterExpression": Attr("expiresAt").not_exists()
+        | Attr("expiresAt").gt(int(time.time())),
+    }
+    while True:
+        resp = ws_table.query(**kwargs)
+        connections.extend(resp.get("Items", []))
+        last_key = resp.get("LastEvaluatedKey")
+        if not last_key:
+            return connections
+        kwargs["ExclusiveStartKey"] = last_key
+
+def _record_tenant(*images):
+    for image in images:
+        if image and image.get("tenant"):
+            return image["tenant"]
+    return None
+
+def _deliver(connection_id, frames):
+    """
+    Posts one connection's frames in order. Errors stay with this connection:
+    returns (connection_id, delivered, failed, gone, latencies_ms).
+    """
+    delivered = failed = 0
+    latencies = []
+    for data in frames:
+        start = time.perf_counter()
+        try:
+            client.post_to_connection(ConnectionId=connection_id, Data=data)
+        except client.exceptions.GoneException:
+            return connection_id, delivered, failed, True, latencies
+        except Exception as e:
+            print("post_to_connection failed", connection_id, e)
+            failed += 1
+            continue
+        latencies.append((time.perf_counter() - start) * 1000)
+        delivered += 1
+    return connection_id, delivered, failed, False, latencies
+
+def _percentile(values, pct):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))]
+
+def _fan_out(outbox):
+    """
+    outbox: connectionId -> list of encoded frames, sent concurrently per
+    connection. Returns (metrics, ids of connections with a failed post).
+    """
+    started = time.perf_counter()
+    results = list(executor.map(lambda item: _deliver(*item), outbox.items()))
+
+    gone = [connection_id for connection_id, _, _, is_gone, _ in results if is_gone]
+    if gone:
+        with ws_table.batch_writer() as batch:
+            for connection_id in gone:
+                batch.delete_item(Key={"connectionId": connection_id})
+
+    latencies = [ms for result in results for ms in result[4]]
+    metrics = {
+        "connections": len(outbox),
+        "delivered": sum(result[1] for result in results),
+        "failed": sum(result[2] for result in results),
+        "gone": len(gone),
+        "postP50Ms": round(_percentile(latencies, 50), 2),
+        "postP99Ms": round(_percentile(latencies, 99), 2),
+        "fanOutMs": round((time.perf_counter() - started) * 1000, 2),
+    }
+    print(json.dumps({"notifyMetrics": metrics}))
+    failed = {connection_id for connection_id, _, errors, _, _ in results if errors}
+    return metrics, failed
+
+def _coalesce(changes):
+    """
+    Collapses successive changes to the same item into one event carrying the
+    first oldImage and the last newImage. INSERT..REMOVE cancels out.
+    """
+    merged = {}
+    for change in changes:
+        key = (
+            change["tableName"],
+            json.dumps(change["keys"], sort_keys=True, default=json_default),
+        )
+        current = merged.get(key)
+        if current is None:
+            merged[key] = dict(change, records=[change["seq"]])
+            continue
+        current["newImage"] = change["newImage"]
+        current["lastEventName"] = change["eventName"]
+        current["seq"] = change["seq"]
+        current["records"].append(change["seq"])
+
+    events = []
+    for event in merged.values():
+        last = event.pop("lastEventName", event["eventName"])
+        existed = event["eventName"] != "INSERT"
+        exists = last != "REMOVE"
+        if not existed and not exists:
+            continue
+        if existed and exists:
+            event["eventName"] = "MODIFY"
+        elif exists:
+            event["eventName"] = "INSERT"
+        else:
+            event["eventName"] = "REMOVE"
+            event["newImage"] = None
+        events.append(event)
+    return events
+
+def _project(image):
+    return {k: v for k, v in (image or {}).items() if k not in INTERNAL_FIELDS}
+
+def _to_delta(event):
+    """
+    Compact event: keys, the attributes that changed (all of them on INSERT),
+    the attributes that were removed and the stream sequence number. Falls
+    back to {"refetch": true} when the delta is still over MAX_EVENT_BYTES.
+    """
+    old = _project(event["oldImage"])
+    new = _project(event["newImage"])
+    delta = {
+        "eventName": event["eventName"],
+        "entityType": event["entityType"],
+        "keys": event["keys"],
+        "seq": event["seq"],
+    }
+    if event["eventName"] != "REMOVE":
+        delta["changed"] = {
+            k: v for k, v in new.items() if k not in event["keys"] and old.get(k) != v
+        }
+        removed = sorted(k for k in old if k not in new)
+        if removed:
+            delta["removed"] = removed
+
+    encoded = json.dumps(delta, default=json_default)
+    if len(encoded) > MAX_EVENT_BYTES:
+        delta.pop("changed", None)
+        delta.pop("removed", None)
+        delta["refetch"] = True
+        encoded = json.dumps(delta, default=json_default)
+    return encoded
+
+def _build_filter_index(connections):
+    """
+    Splits a tenant's connections into those without filters (they get every
+    event) and an index (field, value) -> connections over each subscription's
+    most selective field, so an event only looks at subscriptions that can
+    match it.
+    """
+    unfiltered = []
+    index = {}
+    for conn in connections:
+        filters = conn.get("filters") or {}
+        field = next((name for name, _ in FILTER_FIELDS if filters.get(name)), None)
+        if field is None:
+            unfiltered.append(conn)
+            continue
+        for value in filters[field]:
+            index.setdefault((field, value), []).append(conn)
+    return unfiltered, index
+
+def _audience(values, unfiltered, index):
+    audience = {conn["connectionId"] for conn in unfiltered}
+    for name, attribute in FILTER_FIELDS:
+        for value in values.get(attribute, ()):
+            for conn in index.get((name, value), ()):
+                if matches(conn["filters"], values):
+                    audience.add(conn["connectionId"])
+    return audience
+
+def _select(outbox, connections, events, encoded, values):
+    """
+    Adds each connection's frames (the events its filters select) to the
+    outbox and returns every event's audience, leaving out connections a
+    previous attempt already delivered it to.
+    """
+    # connection -> indexes of the events it subscribed to
+    selected = {}
+    audiences = []
+    unfiltered, index = _build_filter_index(connections)
+    for position, match in enumerate(values):
+        audience = _audience(match, unfiltered, index) - events[position]["delivered"]
+        audiences.append(audience)
+        for connection_id in audience:
+            selected.setdefault(connection_id, []).append(position)
+
+    # connections with the same selection share the same encoded frames
+    frames_by_selection = {}
+    for connection_id, positions in selected.items():
+        selection = tuple(positions)
+        if selection not in frames_by_selection:
+            frames_by_selection[selection] = encode_frames(
+                [encoded[p] for p in selection]
+            )
+        outbox[connection_id] = frames_by_selection[selection]
+    return audiences
+
+def _checkpoints(tenant, events):
+    """
+    Log entries already written for these events by an earlier attempt at the
+    same stream batch: log seq -> entry. An entry still marked `pending` lists
+    the connections it reached in `delivered` and the stream attempts spent in
+    `attempts`; any other entry is done.
+    """
+    keys = [{"tenant": tenant, "seq": log_sort_key(e["seq"])} for e in events if e["seq"]]
+    found = {}
+    for start in range(0, len(keys), 100):
+        request = {
+            event_log_table.name: {
+                "Keys": keys[start : start + 100],
+                "ProjectionExpression": "#seq, #pending, #delivered, #attempts",
+                "ExpressionAttributeNames": {
+                    "#seq": "seq",
+                    "#pending": "pending",
+                    "#delivered": "delivered",
+                    "#attempts": "attempts",
+                },
+            }
+        }
+        for attempt in range(CHECKPOINT_READ_MAX_ATTEMPTS):
+            resp = dynamodb.batch_get_item(RequestItems=request)
+            for item in resp.get("Responses", {}).get(event_log_table.name, []):
+                found[item["seq"]] = item
+            request = resp.get("UnprocessedKeys") or None
+            if not request:
+                break
+            # full jitter keeps throttled retries from hitting the table in lockstep
+            time.sleep(random.uniform(0, min(0.05 * 2**attempt, 2.0)))
+        else:
+            raise RuntimeError("event log checkpoints stayed unprocessed")
+    return found
+
+def _log_item(tenant, event, encoded, match, pending):
+    # replay source for resume.py; entries expire after EVENT_LOG_TTL_SECONDS
+    item = {
+        "tenant": tenant,
+        "seq": log_sort_key(event["seq"]),
+        "event": encoded,
+        "match": match,
+        "expiresAt": int(time.time()) + EVENT_LOG_TTL_SECONDS,
+    }
+    if pending:
+        item["pending"] = True
+    return item
+
+def _prepare_tenant(tenant, changes, outbox):
+    """
+    Coalesces one tenant's changes, drops the ones an earlier attempt finished,
+    logs the new ones and queues their frames. Returns the events whose
+    delivery must be checkpointed once the fan-out is over.
+    """
+    events = _coalesce(changes)
+    checkpoints = _checkpoints(tenant, events) if events else {}
+    fresh = []
+    for e in events:
+        entry = checkpoints.get(log_sort_key(e["seq"])) if e["seq"] else None
+        if entry is not None and not entry.get("pending"):
+            continue  # delivered in full by a previous attempt
+        e["logged"] = entry is not None
+        e["delivered"] = set(entry.get("delivered") or ()) if entry else set()
+        e["attempts"] = int(entry.get("attempts", 0)) if entry else 0
+        fresh.append(e)
+    if not fresh:
+        return []
+
+    encoded = [_to_delta(e) for e in fresh]
+    values = [match_values(e["oldImage"], e["newImage"]) for e in fresh]
+    connections = _tenant_connections(tenant)
+    # queued only once the log entries are written, so a failure in between
+    # leaves nothing sent that a retry would send again
+    frames = {}
+    audiences = _select(frames, connections, fresh, encoded, values) if connections else []
+
+    tracked = []
+    with event_log_table.batch_writer() as batch:
+        for position, e in enumerate(fresh):
+            audience = audiences[position] if audiences else set()
+            if not e["seq"]:
+                continue
+            if not e["logged"]:
+                # pending until the fan-out below confirms every post
+                batch.put_item(
+                    Item=_log_item(tenant, e, encoded[position], values[position], bool(audience))
+                )
+            if audience or e["logged"]:
+                e["item"] = _log_item(tenant, e, encoded[position], values[position], False)
+                tracked.append((e, audience))
+    outbox.update(frames)
+    return tracked
+
+def _checkpoint(tracked, failed_connections):
+    """
+    Marks fully delivered events done and records partial progress on the
+    others. Returns the stream sequence numbers to report as failed: events
+    that still have stream attempts left.
+    """
+    failed_records = []
+    with event_log_table.batch_writer() as batch:
+        for e, audience in tracked:
+            missing = audience & failed_connections
+            if not missing:
+                batch.put_item(Item=e["item"])
+                continue
+            if e["attempts"] + 1 >= NOTIFY_MAX_DELIVERY_ATTEMPTS:
+                print("giving up on connections", e["item"]["seq"], sorted(missing))
+                batch.put_item(Item=dict(e["item"], undelivered=missing))
+                continue
+            update = "ADD #attempts :one"
+            names = {"#attempts": "attempts"}
+            values = {":one": 1}
+            reached = audience - missing
+            if reached:
+                update += ", #delivered :reached"
+                names["#delivered"] = "delivered"
+                values[":reached"] = reached
+            event_log_table.update_item(
+                Key={"tenant": e["item"]["tenant"], "seq": e["item"]["seq"]},
+                UpdateExpression=update,
+                ExpressionAttributeNames=names,
+                ExpressionAttributeValues=values,
+            )
+            failed_records.extend(e["records"])
+    return failed_records
+
 def handler(event, context):
-    connections = ws_table.scan().get("Items", [])
-    if not connections:
-        return {"status": "no-connections"}
+    # tenant -> changes of this invocation, in stream order
+    changes_by_tenant = {}
 
     for record in event.get("Records", []):
         event_name = record.get("eventName")
@@ -58,30 +425,50 @@ def handler(event, context):
         old_image = _deserialize_image(ddb.get("OldImage"))
         keys = _deserialize_image(ddb.get("Keys"))
 
+        tenant = _record_tenant(keys, new_image, old_image)
+        if not tenant:
+            continue
+
         table_arn = record.get("eventSourceARN", "")
         table_name = _get_table_name_from_arn(table_arn)
         entity_type = _guess_entity_type(table_name)
 
-        msg = {
-            "eventName": event_name,
-            "tableName": table_name,
-            "entityType": entity_type,
-            "keys": keys,
-            "newImage": new_image,
-            "oldImage": old_image,
-        }
-
-        data = json.dumps(msg)
+        changes_by_tenant.setdefault(tenant, []).append(
+            {
+                "eventName": event_name,
+                "tableName": table_name,
+                "entityType": entity_type,
+                "keys": keys,
+                "newImage": new_image,
+                "oldImage": old_image,
+                "seq": ddb.get("SequenceNumber"),
+            }
+        )
 
-        for conn in connections:
-            connection_id = conn["connectionId"]
-            try:
-                client.post_to_connection(
-                    ConnectionId=connection_id,
-                    Data=data.encode("utf-8"),
-                )
-            except client.exceptions.GoneException:
-                ws_table.delete_item(Key={"connectionId": connection_id})
+    # Failures are reported per record (ReportBatchItemFailures), so a retry
+    # resumes at the first failed record instead of replaying the batch, and
+    # the event log doubles as the checkpoint that keeps a retry from posting
+    # an event twice to the same connection. Failed posts are retried for at
+    # most NOTIFY_MAX_DELIVERY_ATTEMPTS attempts per event; other failures
+    # are bounded by the event source's maximumRetryAttempts.
+    outbox = {}
+    tracked = []
+    failed_records = []
+    for tenant, changes in changes_by_tenant.items():
+        try:
+            tracked.extend(_prepare_tenant(tenant, changes, outbox))
+        except Exception as e:
+            print("notify failed for tenant", tenant, e)
+            failed_records.extend(change["seq"] for change in changes)
 
-    return {"status": "ok"}
+    metrics = None
+    failed_connections = set()
+    if outbox:
+        metrics, failed_connections = _fan_out(outbox)
+    if tracked:
+        failed_records.extend(_checkpoint(tracked, failed_connections))
 
+    failures = [{"itemIdentifier": seq} for seq in sorted(set(failed_records), key=log_sort_key) if seq]
+    if not outbox:
+        return {"status": "no-connections", "batchItemFailures": failures}
+    return {"status": "ok", "metrics": metrics, "batchItemFailures": failures}
@@ -1,14 +1,20 @@
 import os
+import time
 import boto3
 
 dynamodb = boto3.resource("dynamodb")
 ws_table = dynamodb.Table(os.environ["WEBSOCKETS_TABLE"])
+# rows live this long past the last connect or heartbeat (TTL on expiresAt)
+CONNECTION_TTL_SECONDS = int(os.environ.get("CONNECTION_TTL_SECONDS", 15 * 60))
 
 def handler(event, context):
     connection_id = event["requestContext"]["connectionId"]
     query = event.get("queryStringParameters") or {}
 
-    item = {"connectionId": connection_id}
+    item = {
+        "connectionId": connection_id,
+        "expiresAt": int(time.time()) + CONNECTION_TTL_SECONDS,
+    }
 
     if "userId" in query:
         item["userId"] = query["userId"]
@@ -0,0 +1,98 @@
+import os
+import json
+import boto3
+from boto3.dynamodb.conditions import Key
+from _events import encode_frames, log_sort_key, matches
+
+dynamodb = boto3.resource("dynamodb")
+ws_table = dynamodb.Table(os.environ["WEBSOCKETS_TABLE"])
+event_log_table = dynamodb.Table(os.environ["EVENT_LOG_TABLE"])
+
+# past this many missed events a full refetch is cheaper than a replay
+RESUME_MAX_EVENTS = int(os.environ.get("RESUME_MAX_EVENTS", 500))
+
+def _response(status_code, body):
+    return {"statusCode": status_code, "body": json.dumps(body)}
+
+def _client(event):
+    context = event["requestContext"]
+    endpoint = os.environ.get("API_GATEWAY_ENDPOINT")
+    if context.get("domainName") and context.get("stage"):
+        endpoint = f"https://{context['domainName']}/{context['stage']}"
+    return boto3.client("apigatewaymanagementapi", endpoint_url=endpoint)
+
+def _cursor_in_log(tenant, cursor):
+    # once the cursor's own entry has expired, events right after it may be
+    # gone too and a replay could silently skip them
+    resp = event_log_table.query(
+        KeyConditionExpression=Key("tenant").eq(tenant) & Key("seq").eq(cursor),
+        ProjectionExpression="seq",
+    )
+    return bool(resp.get("Items"))
+
+def _missed_events(tenant, cursor):
+    """Up to RESUME_MAX_EVENTS + 1 log entries after `cursor`, oldest first."""
+    entries = []
+    kwargs = {
+        "KeyConditionExpression": Key("tenant").eq(tenant) & Key("seq").gt(cursor),
+        "Limit": RESUME_MAX_EVENTS + 1,
+    }
+    while len(entries) <= RESUME_MAX_EVENTS:
+        resp = event_log_table.query(**kwargs)
+        entries.extend(resp.get("Items", []))
+        last_key = resp.get("LastEvaluatedKey")
+        if not last_key:
+            break
+        kwargs["ExclusiveStartKey"] = last_key
+        kwargs["Limit"] = RESUME_MAX_EVENTS + 1 - len(entries)
+    return entries
+
+def handler(event, context):
+    """
+    {"action": "resume", "cursor": "<seq of the last event received>"}
+    Replays the tenant's logged events after the cursor, through the
+    connection's subscription filters, as "replay" frames. When the cursor has
+    left the log or too many events were missed, sends
+    {"type": "replay", "refetch": true} instead.
+    """
+    connection_id = event["requestContext"]["connectionId"]
+    try:
+        body = json.loads(event.get("body") or "{}")
+    except ValueError:
+        return _response(400, {"message": "body must be JSON"})
+
+    requested = str(body.get("cursor") or "")
+    if not requested.isdigit():
+        return _response(400, {"message": "cursor must be the seq of an event"})
+    cursor = log_sort_key(requested)
+
+    connection = ws_table.get_item(Key={"connectionId": connection_id}).get("Item")
+    if not connection:
+        return _response(404, {"message": "connection not found"})
+    tenant = connection.get("tenantId")
+    if not tenant:
+        return _response(400, {"message": "connection has no tenantId"})
+
+    client = _client(event)
+    entries = None
+    if _cursor_in_log(tenant, cursor):
+        entries = _missed_events(tenant, cursor)
+    if entries is None or len(entries) > RESUME_MAX_EVENTS:
+        client.post_to_connection(
+            ConnectionId=connection_id,
+            Data=json.dumps({"type": "replay", "refetch": True}).encode("utf-8"),
+        )
+        return _response(200, {"replayed": 0, "refetch": True})
+
+    filters = connection.get("filters") or {}
+    selected = [e["event"] for e in entries if matches(filters, e.get("match") or {})]
+    # the next resume starts after the last logged event, even a filtered one
+    last_seq = entries[-1]["seq"].lstrip("0") if entries else requested
+    frames = encode_frames(selected, frame_type="replay", cursor=last_seq)
+    if not frames:
+        # nothing missed: still confirm the cursor so the client can go live
+        frames = [json.dumps({"cursor": last_seq, "type": "replay", "events": []}).encode("utf-8")]
+    for frame in frames:
+        client.post_to_connection(ConnectionId=connection_id, Data=frame)
+
+    return _response(200, {"replayed": len(selected), "cursor": last_seq})
@@ -0,0 +1,73 @@
+import os
+import json
+import boto3
+from botocore.exceptions import ClientError
+from _events import FILTER_FIELDS
+
+dynamodb = boto3.resource("dynamodb")
+ws_table = dynamodb.Table(os.environ["WEBSOCKETS_TABLE"])
+
+# filters a client can register, matched by notify against each change
+FILTERS = tuple(name for name, _ in FILTER_FIELDS)
+VALID_INCIDENT_STATES = {"PENDING", "ATTENDING", "FINISHED"}
+
+def _response(status_code, body):
+    return {"statusCode": status_code, "body": json.dumps(body)}
+
+def handler(event, context):
+    """
+    {"action": "subscribe", "filters": {"state": ["PENDING"], "creator": "x"}}
+    Values may be a string or a list. Empty filters subscribe to every change
+    of the connection's tenant.
+    """
+    connection_id = event["requestContext"]["connectionId"]
+    try:
+        body = json.loads(event.get("body") or "{}")
+    except ValueError:
+        return _response(400, {"message": "body must be JSON"})
+
+    raw = body.get("filters") or {}
+    if not isinstance(raw, dict):
+        return _response(400, {"message": "filters must be an object"})
+    unknown = sorted(set(raw) - set(FILTERS))
+    if unknown:
+        return _response(400, {"message": f"unknown filters {unknown}, use {list(FILTERS)}"})
+
+    filters = {}
+    for name in FILTERS:
+        values = raw.get(name)
+        if values is None:
+            continue
+        if isinstance(values, str):
+            values = [values]
+        if not isinstance(values, list) or not all(isinstance(v, str) for v in values):
+            return _response(
+                400, {"message": f"{name} must be a string or a list of strings"}
+            )
+        values = [v for v in values if v]
+        if name == "state":
+            values = [v.upper() for v in values]
+            if not set(values) <= VALID_INCIDENT_STATES:
+                return _response(
+                    400, {"message": f"state must be within {sorted(VALID_INCIDENT_STATES)}"}
+                )
+        if values:
+            filters[name] = sorted(set(values))
+
+    update = {
+        "Key": {"connectionId": connection_id},
+        "ConditionExpression": "attribute_exists(connectionId)",
+    }
+    if filters:
+        update["UpdateExpression"] = "SET filters = :f"
+        update["ExpressionAttributeValues"] = {":f": filters}
+    else:
+        update["UpdateExpression"] = "REMOVE filters"
+    try:
+        ws_table.update_item(**update)
+    except ClientError as e:
+        if e.response["Error"]["Code"] != "ConditionalCheckFailedException":
+            raise
+        return _response(404, {"message": "connection not found"})
+
+    return _response(200, {"subscribed": filters})
@@ -0,0 +1,80 @@
+import os
+import json
+import time
+from concurrent.futures import ThreadPoolExecutor
+import boto3
+from botocore.config import Config
+
+SWEEP_CONCURRENCY = int(os.environ.get("FANOUT_CONCURRENCY", 32))
+
+client = boto3.client(
+    "apigatewaymanagementapi",
+    endpoint_url=os.environ["API_GATEWAY_ENDPOINT"],
+    config=Config(
+        max_pool_connections=SWEEP_CONCURRENCY,
+        retries={"mode": "standard", "max_attempts": 3},
+        connect_timeout=2,
+        read_timeout=5,
+    ),
+)
+executor = ThreadPoolExecutor(max_workers=SWEEP_CONCURRENCY)
+
+dynamodb = boto3.resource("dynamodb")
+ws_table = dynamodb.Table(os.environ["WEBSOCKETS_TABLE"])
+
+def _connections():
+    rows = []
+    kwargs = {
+        "ProjectionExpression": "connectionId, expiresAt",
+    }
+    while True:
+        resp = ws_table.scan(**kwargs)
+        rows.extend(resp.get("Items", []))
+        last_key = resp.get("LastEvaluatedKey")
+        if not last_key:
+            return rows
+        kwargs["ExclusiveStartKey"] = last_key
+
+def _probe(row, now):
+    """Returns True when the connection is dead and its row should go."""
+    connection_id = row["connectionId"]
+    expires_at = row.get("expiresAt")
+    try:
+        if expires_at is not None and expires_at <= now:
+            # missed its heartbeats: close it so a half-open client reconnects
+            client.delete_connection(ConnectionId=connection_id)
+            return True
+        client.get_connection(ConnectionId=connection_id)
+    except client.exceptions.GoneException:
+        return True
+    except Exception as e:
+        print("probe failed", connection_id, e)
+    return False
+
+def handler(event, context):
+    """
+    Scheduled. Probes every connection row and deletes, in batches, the ones
+    whose heartbeat lapsed or that API Gateway no longer knows, so notify only
+    fans out to live clients. DynamoDB TTL removes expired rows as well, but
+    only eventually.
+    """
+    started = time.perf_counter()
+    now = int(time.time())
+    rows = _connections()
+    dead = [
+        row["connectionId"]
+        for row, is_dead in zip(rows, executor.map(lambda row: _probe(row, now), rows))
+        if is_dead
+    ]
+    if dead:
+        with ws_table.batch_writer() as batch:
+            for connection_id in dead:
+                batch.delete_item(Key={"connectionId": connection_id})
+
+    metrics = {
+        "connections": len(rows),
+        "purged": len(dead),
+        "sweepMs": round((time.perf_counter() - started) * 1000, 2),
+    }
+    print(json.dumps({"sweeperMetrics": metrics}))
+    return metrics